@@ -0,0 +1,189 @@
+"""
+Inference Autotuner
+
+Sweeps intra-op threads, inter-op threads, input size and batch size for the
+configured model on this host and writes the best combination to a tuning
+profile, which DentalPathologyModel loads at startup (TUNING_PROFILE=auto
+picks up <weights>.tuning.json next to the model).
+
+Each candidate is measured as the server sees it: `--concurrency` requests
+arrive together, the micro-batcher serves them in batches of up to
+`--batch-sizes`, and a request's latency runs until its batch finishes.
+
+Objectives:
+  - throughput: most images/second (optionally with --max-p95-ms)
+  - latency:    lowest p95 latency at the given concurrency
+
+Usage:
+    python autotune.py --objective throughput --concurrency 8
+    python autotune.py --objective latency --concurrency 2 --images ../data/images/valid
+    python autotune.py --imgsz 512,640 --threads 2,4,8 --batch-sizes 1,4
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from config import settings
+from services.inference import DentalPathologyModel
+from services.tuning import host_fingerprint, profile_path_for, save_tuning_profile
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+def parse_list(value):
+    return [int(v) for v in value.split(",") if v.strip()] if value else []
+
+def default_thread_counts(cores):
+    """1, 2, 4, ... up to the core count, plus the core count itself"""
+    counts = [1 << i for i in range(int(math.log2(cores)) + 1)]
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+def load_images(images_dir, count, size):
+    """Up to `count` real images, or synthetic intraoral-sized frames when no directory is given"""
+    if images_dir:
+        paths = sorted(p for p in Path(images_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)[:count]
+        images = [image for image in (cv2.imread(str(p)) for p in paths) if image is not None]
+        if not images:
+            raise ValueError(f"No readable images in {images_dir}")
+        return images
+
+    width, height = size
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+def fixed_input_size(model):
+    """Input size baked into an ONNX export, or None when the graph accepts any size"""
+    if model.backend != "onnx":
+        return None
+    _, _, height, width = model.model.session.get_inputs()[0].shape
+    return max(height, width) if isinstance(height, int) and isinstance(width, int) else None
+
+def measure(model, images, concurrency, batch_size, rounds):
+    """Throughput and per-request latencies for `rounds` bursts of `concurrency` requests"""
+    latencies = []
+    start = time.perf_counter()
+    for r in range(rounds):
+        burst = [images[(r * concurrency + i) % len(images)] for i in range(concurrency)]
+        burst_start = time.perf_counter()
+        for offset in range(0, concurrency, batch_size):
+            batch = burst[offset:offset + batch_size]
+            model.predict_batch(batch, settings.MODEL_CONF_THRESHOLD, settings.MODEL_IOU_THRESHOLD)
+            latencies.extend([(time.perf_counter() - burst_start) * 1000] * len(batch))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(latencies[len(latencies) // 2], 1),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1)
+    }
+
+def score(result, objective, max_p95_ms):
+    """Higher is better"""
+    if objective == "latency":
+        return -result["p95_ms"]
+    if max_p95_ms and result["p95_ms"] > max_p95_ms:
+        return float("-inf")
+    return result["throughput"]
+
+def main():
+    cores = host_fingerprint()["cores"]
+
+    parser = argparse.ArgumentParser(description="Find the fastest inference settings for this host")
+    parser.add_argument("--model", default=settings.MODEL_PATH, help="Model weights (default: MODEL_PATH)")
+    parser.add_argument("--backend", default=settings.MODEL_BACKEND, choices=["torch", "onnx"],
+                        help="Inference backend (default: MODEL_BACKEND)")
+    parser.add_argument("--objective", default="throughput", choices=["throughput", "latency"])
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests in flight at once")
+    parser.add_argument("--max-p95-ms", type=float, default=0, help="Throughput objective: discard slower candidates")
+    parser.add_argument("--threads", default="", help=f"Intra-op thread counts (default: powers of 2 up to {cores})")
+    parser.add_argument("--inter-op-threads", default="1,2", help="Inter-op thread counts")
+    parser.add_argument("--imgsz", default="", help="Input sizes (default: the model's own size)")
+    parser.add_argument("--batch-sizes", default="1,2,4,8", help="Micro-batch sizes (capped at --concurrency)")
+    parser.add_argument("--images", default=None, help="Directory of sample images (default: synthetic)")
+    parser.add_argument("--image-size", default="1920x1080", help="Synthetic image size, WxH")
+    parser.add_argument("--rounds", type=int, default=5, help="Measured bursts per candidate")
+    parser.add_argument("--output", default=None, help="Profile path (default: <weights>.tuning.json)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"❌ Model not found: {args.model}")
+        sys.exit(1)
+
+    concurrency = max(1, args.concurrency)
+    thread_counts = parse_list(args.threads) or default_thread_counts(cores)
+    inter_op_counts = parse_list(args.inter_op_threads) or [0]
+    batch_sizes = sorted({min(b, concurrency) for b in parse_list(args.batch_sizes) or [1]})
+    width, height = (int(v) for v in args.image_size.lower().split("x"))
+    images = load_images(args.images, max(concurrency, 8), (width, height))
+    output = args.output or profile_path_for(args.model)
+
+    if args.backend == "torch" and len(inter_op_counts) > 1:
+        # torch fixes its inter-op pool on first use, so it cannot be swept within one process
+        print(f"⚠️  torch inter-op threads can only be set once per process; using {inter_op_counts[0]}")
+        inter_op_counts = inter_op_counts[:1]
+
+    probe = DentalPathologyModel(args.model, backend=args.backend, tuning_profile=None)
+    fixed = fixed_input_size(probe)
+    sizes = parse_list(args.imgsz) or [probe.default_imgsz]
+    if fixed and sizes != [fixed]:
+        print(f"⚠️  {args.model} was exported with a fixed {fixed}px input; only that size is tried")
+        sizes = [fixed]
+    del probe
+
+    candidates = [(t, i, s) for s in sizes for i in inter_op_counts for t in thread_counts]
+
+    print(f"\n{'='*70}")
+    print(f"  Inference Autotune")
+    print(f"{'='*70}")
+    print(f"📦 Model:       {args.model} ({args.backend})")
+    print(f"🖥️  Host:        {cores} cores")
+    print(f"🎯 Objective:   {args.objective} at concurrency {concurrency}")
+    print(f"🔍 Candidates:  {len(candidates) * len(batch_sizes)} "
+          f"(threads {thread_counts}, inter-op {inter_op_counts}, imgsz {sizes}, batch {batch_sizes})\n")
+
+    results = []
+    for threads, inter_op, imgsz in candidates:
+        # Thread pools are fixed when an onnxruntime session is created, so each combination gets its own model
+        model = DentalPathologyModel(args.model, backend=args.backend, imgsz=imgsz, num_threads=threads,
+                                     inter_op_threads=inter_op, tuning_profile=None)
+        for batch_size in batch_sizes:
+            model.predict_batch(images[:batch_size])
+            result = measure(model, images, concurrency, batch_size, args.rounds)
+            result.update({"intra_op_threads": threads, "inter_op_threads": inter_op, "imgsz": imgsz,
+                           "batch_size": batch_size})
+            results.append(result)
+            print(f"   threads={threads:<3} inter-op={inter_op:<2} imgsz={imgsz:<5} batch={batch_size:<3} "
+                  f"{result['throughput']:>7.2f} img/s  p50 {result['p50_ms']:>7.1f} ms  p95 {result['p95_ms']:>7.1f} ms")
+        del model
+
+    best = max(results, key=lambda r: score(r, args.objective, args.max_p95_ms))
+    if score(best, args.objective, args.max_p95_ms) == float("-inf"):
+        print(f"\n❌ No candidate met p95 <= {args.max_p95_ms} ms; no profile written")
+        sys.exit(1)
+
+    save_tuning_profile(output, args.model, args.backend, args.objective, concurrency, best, results)
+
+    print(f"\n{'='*70}")
+    print(f"✅ Best: threads={best['intra_op_threads']}, inter-op={best['inter_op_threads']}, "
+          f"imgsz={best['imgsz']}, batch={best['batch_size']}")
+    print(f"   {best['throughput']:.2f} img/s, p50 {best['p50_ms']:.1f} ms, p95 {best['p95_ms']:.1f} ms")
+    print(f"💾 Profile saved to {output}")
+    if os.path.abspath(output) != os.path.abspath(profile_path_for(args.model)):
+        print(f"   Load it with TUNING_PROFILE={output}")
+    print(f"{'='*70}\n")
+
+if __name__ == "__main__":
+    main()
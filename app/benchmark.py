@@ -0,0 +1,212 @@
+"""
+Post-processing Microbenchmarks
+
+Times the CPU hot paths between the model output and the API response on
+synthetic inputs, so no GPU or trained weights are needed:
+
+  - mask_to_normalized_polygon / polygon_to_absolute / normalize_polygon
+  - encode_rle
+  - calculate_bbox_from_polygon
+  - DentalPathologyModel._format_results (native and full polygon modes, polygon and RLE output)
+
+Inputs mimic a 5000x3000 intraoral photo run at 640: masks of 640x384
+with 1-50 elliptical detections.
+
+Usage:
+    python benchmark.py --save baseline.json
+    python benchmark.py --compare baseline.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import os
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from utils.polygon_utils import mask_to_normalized_polygon, polygon_to_absolute, normalize_polygon, encode_rle
+from routes.analyze import calculate_bbox_from_polygon
+from services.inference import DentalPathologyModel
+
+ORIG_SHAPE = (3000, 5000)
+MASK_SHAPE = (384, 640)
+DETECTION_COUNTS = (1, 10, 50)
+
+def make_masks(count, shape=MASK_SHAPE, seed=0):
+    """`count` filled ellipses of varied size and position, plus their xyxy boxes in mask pixels"""
+    rng = np.random.default_rng(seed)
+    height, width = shape
+    masks = np.zeros((count, height, width), dtype=np.float32)
+    boxes = np.zeros((count, 4), dtype=np.float32)
+
+    for i in range(count):
+        axes = (int(rng.integers(8, width // 6)), int(rng.integers(8, height // 6)))
+        center = (int(rng.integers(axes[0], width - axes[0])), int(rng.integers(axes[1], height - axes[1])))
+        cv2.ellipse(masks[i], center, axes, float(rng.uniform(0, 180)), 0, 360, 1.0, -1)
+        ys, xs = np.nonzero(masks[i])
+        boxes[i] = (xs.min(), ys.min(), xs.max() + 1, ys.max() + 1)
+
+    return masks, boxes
+
+class _Boxes(SimpleNamespace):
+    def __len__(self):
+        return len(self.cls)
+
+def make_result(count, orig_shape=ORIG_SHAPE, seed=0):
+    """Stand-in for an ultralytics Results object with `count` segmentation detections"""
+    masks, boxes = make_masks(count, seed=seed)
+    gain = min(MASK_SHAPE[0] / orig_shape[0], MASK_SHAPE[1] / orig_shape[1])
+    rng = np.random.default_rng(seed)
+
+    return SimpleNamespace(
+        orig_shape=orig_shape,
+        boxes=_Boxes(
+            xyxy=boxes / gain,
+            conf=rng.uniform(0.25, 0.95, count).astype(np.float32),
+            cls=rng.integers(0, 9, count).astype(np.float32)
+        ),
+        masks=SimpleNamespace(data=masks)
+    )
+
+def make_model(polygon_mode):
+    """DentalPathologyModel without weights; only _format_results is exercised"""
+    model = DentalPathologyModel.__new__(DentalPathologyModel)
+    model.polygon_mode = polygon_mode
+    model.class_names = {i: f"Class {i}" for i in range(9)}
+    return model
+
+def build_cases():
+    cases = {}
+
+    for count in DETECTION_COUNTS:
+        result = make_result(count)
+        for mode in ("native", "full"):
+            model = make_model(mode)
+            cases[f"format_results[{mode},{count}det]"] = (lambda m=model, r=result: m._format_results(r))
+            cases[f"format_results[{mode},rle,{count}det]"] = (lambda m=model, r=result: m._format_results(r, "rle"))
+
+    mask = make_masks(1)[0][0]
+    polygon = mask_to_normalized_polygon(mask)
+    dense_polygon = mask_to_normalized_polygon(mask, simplify=False)
+    absolute = polygon_to_absolute(dense_polygon, ORIG_SHAPE[1], ORIG_SHAPE[0])
+
+    cases["mask_to_normalized_polygon[640]"] = lambda: mask_to_normalized_polygon(mask)
+    cases["encode_rle[640]"] = lambda: encode_rle(mask)
+    cases["polygon_to_absolute"] = lambda: polygon_to_absolute(dense_polygon, ORIG_SHAPE[1], ORIG_SHAPE[0])
+    cases["normalize_polygon"] = lambda: normalize_polygon(absolute, ORIG_SHAPE[1], ORIG_SHAPE[0])
+    cases["calculate_bbox_from_polygon"] = lambda: calculate_bbox_from_polygon(polygon)
+
+    return cases
+
+def measure(fn, min_time=0.2, repeat=5):
+    """Per-call seconds over `repeat` rounds, each sized to run at least `min_time`"""
+    fn()
+    start = time.perf_counter()
+    fn()
+    single = max(time.perf_counter() - start, 1e-7)
+    loops = max(1, int(min_time / single))
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter() - start) / loops)
+
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 6),
+        "min_ms": round(min(timings) * 1000, 6),
+        "loops": loops,
+        "repeat": repeat
+    }
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__
+    }
+
+def compare(results, baseline, threshold):
+    """Print the change against a baseline; returns names that regressed beyond `threshold`"""
+    regressions = []
+    print(f"\n{'Benchmark':<42} {'Baseline':>12} {'Current':>12} {'Change':>9}")
+    print("-" * 78)
+
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            print(f"{name:<42} {'-':>12} {current['median_ms']:>10.4f}ms {'new':>9}")
+            continue
+
+        change = current["median_ms"] / previous["median_ms"] - 1.0 if previous["median_ms"] else 0.0
+        marker = ""
+        if change > threshold:
+            marker = " ❌"
+            regressions.append(name)
+        elif change < -threshold:
+            marker = " ✅"
+        print(f"{name:<42} {previous['median_ms']:>10.4f}ms {current['median_ms']:>10.4f}ms {change:>+8.1%}{marker}")
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark post-processing hot paths')
+    parser.add_argument('--filter', type=str, default='',
+                       help='Only run benchmarks whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=5,
+                       help='Timing rounds per benchmark (median is reported)')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                       help='Minimum seconds per timing round')
+    parser.add_argument('--save', type=str, default=None,
+                       help='Write results to this JSON baseline')
+    parser.add_argument('--compare', type=str, default=None,
+                       help='Compare against a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                       help='Relative slowdown that counts as a regression (default: 0.10)')
+
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("  AlphaDent Post-processing Benchmarks")
+    print("=" * 70 + "\n")
+
+    cases = {name: fn for name, fn in build_cases().items() if args.filter in name}
+    if not cases:
+        print(f"❌ No benchmarks match '{args.filter}'")
+        sys.exit(1)
+
+    results = {}
+    for name, fn in cases.items():
+        results[name] = measure(fn, min_time=args.min_time, repeat=args.repeat)
+        print(f"   {name:<42} {results[name]['median_ms']:>10.4f}ms  (x{results[name]['loops']})")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+        print(f"\n✅ Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != environment():
+            print("\n⚠️  Baseline was recorded in a different environment; compare with care")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+
+if __name__ == '__main__':
+    main()
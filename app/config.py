@@ -9,12 +9,86 @@ class Settings:
     cors_origins_str = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:3001,http://127.0.0.1:3000")
     CORS_ORIGINS: List[str] = [origin.strip() for origin in cors_origins_str.split(",")]
     
-    MODEL_PATH: str = os.getenv("MODEL_PATH", "models/best.pt")
+    MODEL_BACKEND: str = os.getenv("MODEL_BACKEND", "torch").lower()
+    MODEL_PATH: str = os.getenv("MODEL_PATH", "models/best.onnx" if MODEL_BACKEND == "onnx" else "models/best.pt")
+    MODEL_DIR: str = os.getenv("MODEL_DIR", os.path.dirname(MODEL_PATH) or ".")  # hot-swapped weights must live here
+    MODEL_ADMIN_TOKEN: str = os.getenv("MODEL_ADMIN_TOKEN", "")  # X-Admin-Token for /api/models/load; empty disables it
+    MODEL_REGISTRY_HISTORY: int = int(os.getenv("MODEL_REGISTRY_HISTORY", "10"))
+    # With WORKERS>1, a load through any process is recorded here and every process follows it
+    MODEL_SYNC_PATH: str = os.getenv("MODEL_SYNC_PATH", os.path.join(MODEL_DIR, ".active_model.json"))
+    MODEL_SYNC_INTERVAL: float = float(os.getenv("MODEL_SYNC_INTERVAL", "2"))  # seconds between checks
+    MODEL_IMGSZ: int = int(os.getenv("MODEL_IMGSZ", "0"))  # 0 = size the model was trained/exported at
+    POLYGON_MODE: str = os.getenv("POLYGON_MODE", "native").lower()  # native | full
+    TILED_INFERENCE: bool = os.getenv("TILED_INFERENCE", "False").lower() == "true"
+    TILE_SIZE: int = int(os.getenv("TILE_SIZE", "1280"))
+    TILE_OVERLAP: float = float(os.getenv("TILE_OVERLAP", "0.2"))
+    TILE_BATCH_SIZE: int = int(os.getenv("TILE_BATCH_SIZE", "4"))
+    TILE_WORKERS: int = int(os.getenv("TILE_WORKERS", "4"))
+    WARMUP_IMAGE_SIZES: List[int] = [int(size) for size in os.getenv("WARMUP_IMAGE_SIZES", "").split(",") if size.strip()]
+    
+    # MODEL_BACKEND=synthetic: stand-in model with configurable latency, for load testing without weights
+    SYNTHETIC_LATENCY_MS: float = float(os.getenv("SYNTHETIC_LATENCY_MS", "80"))
+    SYNTHETIC_BATCH_LATENCY_MS: float = float(os.getenv("SYNTHETIC_BATCH_LATENCY_MS", "15"))  # per extra image in a batch
+    SYNTHETIC_LATENCY_JITTER: float = float(os.getenv("SYNTHETIC_LATENCY_JITTER", "0.3"))  # log-normal sigma
+    SYNTHETIC_LATENCY_MODE: str = os.getenv("SYNTHETIC_LATENCY_MODE", "sleep").lower()  # sleep | burn
+    SYNTHETIC_MAX_DETECTIONS: int = int(os.getenv("SYNTHETIC_MAX_DETECTIONS", "12"))
+    SYNTHETIC_POLYGON_POINTS: int = int(os.getenv("SYNTHETIC_POLYGON_POINTS", "80"))
+    
     MODEL_CONF_THRESHOLD: float = float(os.getenv("MODEL_CONF_THRESHOLD", "0.25"))
     MODEL_IOU_THRESHOLD: float = float(os.getenv("MODEL_IOU_THRESHOLD", "0.45"))
     
+    BATCHING_ENABLED: bool = os.getenv("BATCHING_ENABLED", "True").lower() == "true"
+    BATCH_MAX_SIZE: int = int(os.getenv("BATCH_MAX_SIZE", "0"))  # 0 = tuning profile's batch size, else 8
+    BATCH_MAX_WAIT_MS: float = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+    BATCH_MAX_FILES: int = int(os.getenv("BATCH_MAX_FILES", "32"))  # files per /api/analyze/batch request
+    BATCH_REQUEST_CONCURRENCY: int = int(os.getenv("BATCH_REQUEST_CONCURRENCY", "0"))  # images in flight per batch request, 0 = half the inference queue
+    
+    WORKERS: int = int(os.getenv("WORKERS", "1"))  # uvicorn worker processes
+    PRELOAD_MODEL: bool = os.getenv("PRELOAD_MODEL", "False").lower() == "true"  # load once, fork workers sharing the weights
+    WORKER_THREADS: int = int(os.getenv("WORKER_THREADS", "0"))  # torch threads per preloaded worker, 0 = cores / WORKERS
+    INFERENCE_THREADS: int = int(os.getenv("INFERENCE_THREADS", "0"))  # intra-op threads, 0 = tuning profile or library default
+    INFERENCE_INTER_OP_THREADS: int = int(os.getenv("INFERENCE_INTER_OP_THREADS", "0"))
+    TUNING_PROFILE: str = os.getenv("TUNING_PROFILE", "auto")  # auto = <weights>.tuning.json if present, empty disables
+    INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", "0"))  # >0 runs the model in that many pinned worker processes
+    INFERENCE_WORKER_THREADS: int = int(os.getenv("INFERENCE_WORKER_THREADS", "0"))  # cores per worker, 0 = split evenly
+    INFERENCE_PIN_CORES: bool = os.getenv("INFERENCE_PIN_CORES", "True").lower() == "true"
+    INFERENCE_WORKER_SLOT_MB: int = int(os.getenv("INFERENCE_WORKER_SLOT_MB", "64"))
+    INFERENCE_WORKER_TIMEOUT: float = float(os.getenv("INFERENCE_WORKER_TIMEOUT", "120"))  # seconds before a silent worker is restarted
+    INFERENCE_CONCURRENCY: int = int(os.getenv("INFERENCE_CONCURRENCY", "2"))
+    INFERENCE_QUEUE_SIZE: int = int(os.getenv("INFERENCE_QUEUE_SIZE", "16"))
+    QUEUE_FULL_STATUS_CODE: int = int(os.getenv("QUEUE_FULL_STATUS_CODE", "503"))
+    
+    RESULT_CACHE_ENABLED: bool = os.getenv("RESULT_CACHE_ENABLED", "True").lower() == "true"
+    RESULT_CACHE_BACKEND: str = os.getenv("RESULT_CACHE_BACKEND", "memory").lower()  # memory | redis
+    RESULT_CACHE_SIZE: int = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+    RESULT_CACHE_TTL: float = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "False").lower() == "true"
+    PROFILING_TOKEN: str = os.getenv("PROFILING_TOKEN", "")  # when set, X-Profile-Token must match
+    PROFILING_DIR: str = os.getenv("PROFILING_DIR", "profiles")
+    PROFILING_KEEP: int = int(os.getenv("PROFILING_KEEP", "50"))  # newest cProfile dumps kept, 0 = keep all
+    
+    # Background jobs (POST /api/jobs), persisted in SQLite
+    JOBS_ENABLED: bool = os.getenv("JOBS_ENABLED", "True").lower() == "true"
+    JOBS_DB_PATH: str = os.getenv("JOBS_DB_PATH", "jobs/jobs.sqlite3")
+    JOBS_UPLOAD_DIR: str = os.getenv("JOBS_UPLOAD_DIR", "jobs/uploads")
+    JOBS_WORKERS: int = int(os.getenv("JOBS_WORKERS", "2"))  # per server process
+    JOBS_MAX_ACTIVE: int = int(os.getenv("JOBS_MAX_ACTIVE", "100"))  # queued + running before POST returns 503
+    JOBS_RESULT_TTL: float = float(os.getenv("JOBS_RESULT_TTL", "3600"))  # seconds a finished job is kept
+    JOBS_STALE_SECONDS: float = float(os.getenv("JOBS_STALE_SECONDS", "60"))  # running jobs without a heartbeat are requeued
+    JOBS_MAX_ATTEMPTS: int = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+    
+    REDUCED_DECODE: bool = os.getenv("REDUCED_DECODE", "True").lower() == "true"
+    DECODE_WORKERS: int = int(os.getenv("DECODE_WORKERS", "0"))  # threads decoding uploads, 0 = min(4, cores)
+    
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
+    UPLOAD_SPOOL_TO_DISK: bool = os.getenv("UPLOAD_SPOOL_TO_DISK", "False").lower() == "true"
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", str(50 * 1024 * 1024)))
+    MAX_REQUEST_SIZE: int = int(os.getenv("MAX_REQUEST_SIZE", str(8 * 50 * 1024 * 1024 + 1024 * 1024)))  # /api/analyze/batch body
+    MAX_JSON_BODY_SIZE: int = int(os.getenv("MAX_JSON_BODY_SIZE", str(1024 * 1024)))  # routes without file uploads
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
 
 settings = Settings()
 
@@ -0,0 +1,183 @@
+"""
+Submission Generator
+
+Runs the trained model over a directory of test images and writes the
+competition CSV (id,patient_id,class_id,confidence,poly).
+
+The work is pipelined: decode workers prefetch images, the model runs
+batched forwards, a post-processing pool converts masks to polygons and
+rows are streamed to the CSV as soon as each image is done.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from config import settings
+from services.inference import DentalPathologyModel
+from utils.image_processing import decode_image_reduced, IDENTITY_TRANSFORM
+from utils.polygon_utils import remap_predictions
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+def find_images(images_dir):
+    """Sorted list of image files in images_dir"""
+    return sorted(p for p in Path(images_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+def read_image(path, target_size=0):
+    """Decode an image, at reduced JPEG scale when target_size allows it"""
+    if target_size:
+        image, transform = decode_image_reduced(Path(path).read_bytes(), target_size)
+    else:
+        image, transform = cv2.imread(str(path)), IDENTITY_TRANSFORM
+    if image is None:
+        raise ValueError(f"Could not read image: {path}")
+    return image, transform
+
+def iter_batches(image_paths, decode_pool, batch_size, prefetch, target_size=0):
+    """Yield (paths, images, transforms) batches while keeping `prefetch` decodes in flight"""
+    pending = deque()
+    paths = iter(image_paths)
+
+    def fill():
+        while len(pending) < prefetch:
+            path = next(paths, None)
+            if path is None:
+                return
+            pending.append((path, decode_pool.submit(read_image, path, target_size)))
+
+    fill()
+    while pending:
+        batch_paths, batch_images, batch_transforms = [], [], []
+        while pending and len(batch_paths) < batch_size:
+            path, future = pending.popleft()
+            try:
+                image, transform = future.result()
+                batch_images.append(image)
+                batch_transforms.append(transform)
+                batch_paths.append(path)
+            except Exception as e:
+                print(f"⚠️  Skipping {path.name}: {e}")
+            fill()
+        if batch_paths:
+            yield batch_paths, batch_images, batch_transforms
+
+def format_rows(model, result, transform, patient_id):
+    rows = []
+    for prediction in remap_predictions(model._format_results(result), transform):
+        poly = " ".join(f"{value:.6f}" for value in prediction["polygon"])
+        rows.append((patient_id, prediction["class_id"], prediction["confidence"], poly))
+    return rows
+
+def generate_submission(model, images_dir, output_path, batch_size=8, decode_workers=4,
+                        post_workers=4, prefetch=None, conf=0.25, iou=0.45, reduced_decode=True):
+    image_paths = find_images(images_dir)
+    if not image_paths:
+        print(f"❌ No images found in {images_dir}")
+        return 0
+
+    prefetch = prefetch or batch_size * 2
+    target_size = (model.imgsz or model.default_imgsz) if reduced_decode else 0
+    print(f"📊 Found {len(image_paths)} images")
+    print(f"   Batch size: {batch_size}, decode workers: {decode_workers}, post-process workers: {post_workers}\n")
+
+    start = time.perf_counter()
+    processed = 0
+    row_id = 0
+
+    with ThreadPoolExecutor(decode_workers, thread_name_prefix="decode") as decode_pool, \
+            ThreadPoolExecutor(post_workers, thread_name_prefix="postprocess") as post_pool, \
+            open(output_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "patient_id", "class_id", "confidence", "poly"])
+        in_flight = deque()
+
+        def drain(limit):
+            nonlocal processed, row_id
+            while len(in_flight) > limit:
+                for row in in_flight.popleft().result():
+                    writer.writerow((row_id, *row))
+                    row_id += 1
+                processed += 1
+                if processed % 50 == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"   {processed}/{len(image_paths)} images ({processed / elapsed:.2f} img/s)")
+
+        for batch_paths, batch_images, batch_transforms in iter_batches(image_paths, decode_pool, batch_size,
+                                                                        prefetch, target_size):
+            results = model.forward(batch_images, conf, iou)
+            for path, result, transform in zip(batch_paths, results, batch_transforms):
+                in_flight.append(post_pool.submit(format_rows, model, result, transform, path.stem))
+            drain(post_workers * 2)
+
+        drain(0)
+
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ Wrote {row_id} predictions for {processed} images to {output_path}")
+    print(f"   Total time: {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.2f} img/s)")
+    return processed
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a competition submission CSV')
+    parser.add_argument('--images', type=str, default='images/test',
+                       help='Directory with test images')
+    parser.add_argument('--output', type=str, default='submission.csv',
+                       help='Output CSV path')
+    parser.add_argument('--model', type=str, default=settings.MODEL_PATH,
+                       help='Model weights (.pt or .onnx)')
+    parser.add_argument('--backend', type=str, default=settings.MODEL_BACKEND, choices=['torch', 'onnx'],
+                       help='Inference backend')
+    parser.add_argument('--imgsz', type=int, default=settings.MODEL_IMGSZ,
+                       help='Inference image size (0 = model default)')
+    parser.add_argument('--batch', type=int, default=8,
+                       help='Images per forward pass')
+    parser.add_argument('--decode-workers', type=int, default=4,
+                       help='Parallel JPEG decode threads')
+    parser.add_argument('--post-workers', type=int, default=os.cpu_count() or 4,
+                       help='Parallel mask-to-polygon threads')
+    parser.add_argument('--prefetch', type=int, default=None,
+                       help='Images decoded ahead of the model (default: 2 x batch)')
+    parser.add_argument('--full-decode', action='store_true',
+                       help='Decode JPEGs at full resolution instead of a reduced DCT scale')
+    parser.add_argument('--conf', type=float, default=settings.MODEL_CONF_THRESHOLD,
+                       help='Confidence threshold')
+    parser.add_argument('--iou', type=float, default=settings.MODEL_IOU_THRESHOLD,
+                       help='NMS IoU threshold')
+
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("  AlphaDent Submission Generator")
+    print("=" * 70 + "\n")
+
+    print(f"📦 Loading model: {args.model} ({args.backend})")
+    model = DentalPathologyModel(args.model, backend=args.backend, imgsz=args.imgsz,
+                                 polygon_mode=settings.POLYGON_MODE)
+    print("✅ Model loaded\n")
+
+    generate_submission(
+        model,
+        args.images,
+        args.output,
+        batch_size=args.batch,
+        decode_workers=args.decode_workers,
+        post_workers=args.post_workers,
+        prefetch=args.prefetch,
+        conf=args.conf,
+        iou=args.iou,
+        reduced_decode=not args.full_decode
+    )
+
+if __name__ == '__main__':
+    main()
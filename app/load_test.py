@@ -0,0 +1,216 @@
+"""
+Load Test
+
+Replays image uploads against a running server at a target request rate
+and reports throughput, latency percentiles and errors.
+
+Requests are sent open-loop: arrivals follow the schedule (fixed interval
+or Poisson) regardless of how fast the server answers, so queueing shows
+up as latency and 503s rather than a silently lower send rate.
+
+Pair it with the synthetic model to size workers and queues without
+weights, e.g.:
+
+    MODEL_BACKEND=synthetic SYNTHETIC_LATENCY_MS=120 RESULT_CACHE_ENABLED=false python main.py
+    python load_test.py --rps 20 --duration 60 --sizes 1280x720,5000x3000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+def parse_sizes(value):
+    sizes = []
+    for item in value.split(','):
+        width, height = item.lower().strip().split('x')
+        sizes.append((int(width), int(height)))
+    return sizes
+
+def synthetic_jpeg(width, height, seed, quality=90):
+    """A smooth gradient with sensor-like noise, so encoded size is close to a real photo"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None, None]
+    tint = rng.uniform(0.3, 1.0, 3).astype(np.float32)
+    image = (x * tint + y * (1 - tint)) / 2 + rng.normal(0, 6, (height, width, 3)).astype(np.float32)
+    ok, encoded = cv2.imencode('.jpg', np.clip(image, 0, 255).astype(np.uint8), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError(f"Could not encode {width}x{height} image")
+    return encoded.tobytes()
+
+def load_payloads(images_dir=None, sizes=None, variants=4):
+    """(name, jpeg bytes) pairs: files from images_dir, or `variants` synthetic images per size"""
+    if images_dir:
+        paths = sorted(p for p in Path(images_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+        return [(p.name, p.read_bytes()) for p in paths]
+
+    payloads = []
+    for width, height in sizes:
+        for i in range(variants):
+            payloads.append((f"synthetic_{width}x{height}_{i}.jpg", synthetic_jpeg(width, height, seed=i)))
+    return payloads
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+async def send(client, url, payload, results, semaphore):
+    name, content = payload
+    if semaphore.locked():
+        results.append({"status": "client_saturated", "latency": 0.0, "bytes": len(content)})
+        return
+
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, files={"file": (name, content, "image/jpeg")})
+            status = response.status_code
+        except httpx.TimeoutException:
+            status = "timeout"
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        results.append({"status": status, "latency": time.perf_counter() - start, "bytes": len(content)})
+
+async def run_load(url, payloads, rps, duration, poisson=False, max_in_flight=256, timeout=60.0, seed=0):
+    rng = random.Random(seed)
+    results = []
+    semaphore = asyncio.Semaphore(max_in_flight)
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        next_at = start
+        tasks = []
+
+        while next_at - start < duration:
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(send(client, url, rng.choice(payloads), results, semaphore)))
+            next_at += rng.expovariate(rps) if poisson else 1.0 / rps
+
+        sent_seconds = loop.time() - start
+        await asyncio.gather(*tasks)
+        total_seconds = loop.time() - start
+
+    return results, sent_seconds, total_seconds
+
+def summarize(results, sent_seconds, total_seconds):
+    statuses = Counter(str(r["status"]) for r in results)
+    succeeded = [r["latency"] for r in results if r["status"] == 200]
+    errors = len(results) - len(succeeded)
+
+    return {
+        "requests": len(results),
+        "succeeded": len(succeeded),
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "offered_rps": round(len(results) / sent_seconds, 2) if sent_seconds else 0.0,
+        "throughput_rps": round(len(succeeded) / total_seconds, 2) if total_seconds else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(succeeded, 0.50) * 1000, 1),
+            "p95": round(percentile(succeeded, 0.95) * 1000, 1),
+            "p99": round(percentile(succeeded, 0.99) * 1000, 1),
+            "max": round(max(succeeded) * 1000, 1) if succeeded else 0.0
+        },
+        "statuses": dict(sorted(statuses.items())),
+        "upload_mb": round(sum(r["bytes"] for r in results) / 1024 / 1024, 1)
+    }
+
+def print_summary(summary):
+    latency = summary["latency_ms"]
+    print(f"\n📊 Requests:    {summary['requests']} ({summary['upload_mb']}MB uploaded)")
+    print(f"   Offered:     {summary['offered_rps']} req/s")
+    print(f"   Throughput:  {summary['throughput_rps']} req/s")
+    print(f"   Latency:     p50 {latency['p50']}ms | p95 {latency['p95']}ms | p99 {latency['p99']}ms | max {latency['max']}ms")
+    print(f"   Error rate:  {summary['error_rate']:.2%}")
+    print(f"   Statuses:    " + ", ".join(f"{status}: {count}" for status, count in summary["statuses"].items()))
+
+def main():
+    parser = argparse.ArgumentParser(description='Open-loop load test for /api/analyze')
+    parser.add_argument('--url', type=str, default='http://localhost:8000/api/analyze',
+                       help='Endpoint to upload to')
+    parser.add_argument('--rps', type=float, default=10.0,
+                       help='Target requests per second')
+    parser.add_argument('--duration', type=float, default=30.0,
+                       help='Seconds to keep sending')
+    parser.add_argument('--poisson', action='store_true',
+                       help='Poisson arrivals instead of a fixed interval')
+    parser.add_argument('--images', type=str, default=None,
+                       help='Replay images from this directory instead of synthetic ones')
+    parser.add_argument('--sizes', type=str, default='1280x720,3000x2000,5000x3000',
+                       help='Synthetic image sizes, WIDTHxHEIGHT comma-separated')
+    parser.add_argument('--variants', type=int, default=4,
+                       help='Distinct synthetic images per size')
+    parser.add_argument('--max-in-flight', type=int, default=256,
+                       help='Client-side cap on concurrent requests')
+    parser.add_argument('--timeout', type=float, default=60.0,
+                       help='Per-request timeout in seconds')
+    parser.add_argument('--warmup', type=int, default=2,
+                       help='Requests sent before measuring')
+    parser.add_argument('--json', type=str, default=None,
+                       help='Also write the summary to this JSON file')
+
+    args = parser.parse_args()
+
+    if not HTTPX_AVAILABLE:
+        print("❌ httpx package is not installed. Install with: pip install httpx")
+        sys.exit(1)
+
+    print("=" * 70)
+    print("  AlphaDent Load Test")
+    print("=" * 70 + "\n")
+
+    payloads = load_payloads(args.images, parse_sizes(args.sizes), args.variants)
+    if not payloads:
+        print(f"❌ No images found in {args.images}")
+        sys.exit(1)
+
+    sizes_mb = [len(content) / 1024 / 1024 for _, content in payloads]
+    print(f"📦 {len(payloads)} payloads, {min(sizes_mb):.2f}-{max(sizes_mb):.2f}MB")
+    print(f"   Target: {args.rps} req/s for {args.duration}s ({'Poisson' if args.poisson else 'fixed'} arrivals)")
+    print(f"   URL: {args.url}\n")
+
+    if args.warmup:
+        asyncio.run(run_load(args.url, payloads, rps=args.warmup, duration=1.0, timeout=args.timeout))
+
+    results, sent_seconds, total_seconds = asyncio.run(run_load(
+        args.url,
+        payloads,
+        rps=args.rps,
+        duration=args.duration,
+        poisson=args.poisson,
+        max_in_flight=args.max_in_flight,
+        timeout=args.timeout
+    ))
+
+    summary = summarize(results, sent_seconds, total_seconds)
+    print_summary(summary)
+
+    if args.json:
+        summary["config"] = {key: value for key, value in vars(args).items() if key != 'json'}
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n✅ Saved summary to {args.json}")
+
+if __name__ == '__main__':
+    main()
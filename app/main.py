@@ -1,8 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
 import uvicorn
 import os
+import signal
+import socket
 import sys
 
 # Add current directory to path for local imports
@@ -10,8 +13,11 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
-from routes import analyze
+from routes import analyze, jobs
 from config import settings
+from services import metrics
+from utils.upload import RequestSizeLimit
+import asyncio
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -20,9 +26,24 @@ async def lifespan(app: FastAPI):
     print("="*60)
     print(f"  Server running on: http://localhost:{settings.PORT}")
     print(f"  Health check: http://localhost:{settings.PORT}/api/health")
+    print(f"  Readiness: http://localhost:{settings.PORT}/api/ready")
     print(f"  API docs: http://localhost:{settings.PORT}/docs")
     print("="*60 + "\n")
+    if analyze.model_state["status"] == "preloaded":
+        analyze.model_state["status"] = "loading"
+        app.state.model_loader = asyncio.get_running_loop().run_in_executor(None, analyze.finish_preload)
+    else:
+        analyze.model_state["status"] = "loading"
+        app.state.model_loader = asyncio.get_running_loop().run_in_executor(None, analyze.load_model)
+    model_sync = asyncio.create_task(analyze.sync_model_version()) if analyze.model_sync_enabled() else None
+    await jobs.start_jobs()
     yield
+    if model_sync is not None:
+        model_sync.cancel()
+    await jobs.stop_jobs()
+    analyze.model_registry.close()
+    analyze.inference_executor.shutdown()
+    analyze.decode_pool.shutdown(wait=False, cancel_futures=True)
 
 app = FastAPI(
     title="AlphaDent API",
@@ -31,6 +52,20 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Room for multipart boundaries and part headers around a single file
+MULTIPART_OVERHEAD = 64 * 1024
+SINGLE_FILE_ROUTES = ("/api/analyze", "/api/jobs")
+
+def request_size_limit(scope) -> int:
+    path = scope["path"].rstrip("/")
+    if path in SINGLE_FILE_ROUTES:
+        return settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD
+    if path == "/api/analyze/batch":
+        return settings.MAX_REQUEST_SIZE
+    return settings.MAX_JSON_BODY_SIZE
+
+app.add_middleware(RequestSizeLimit, limit_for=request_size_limit)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
@@ -40,6 +75,7 @@ app.add_middleware(
 )
 
 app.include_router(analyze.router, prefix="/api", tags=["analysis"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
 
 @app.get("/")
 async def root():
@@ -49,8 +85,13 @@ async def root():
         "status": "running",
         "endpoints": {
             "health": "/api/health",
+            "ready": "/api/ready",
             "classes": "/api/classes",
             "analyze": "/api/analyze",
+            "analyze_batch": "/api/analyze/batch",
+            "jobs": "/api/jobs",
+            "models": "/api/models",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
@@ -59,6 +100,25 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "AlphaDent API"}
 
+@app.get("/api/ready")
+async def readiness_check():
+    status = analyze.model_state["status"]
+    content = {
+        "status": status,
+        "model_loaded": analyze.model_instance is not None,
+        "model_version": analyze.model_registry.active.version if analyze.model_registry.active else None,
+        "load_seconds": analyze.model_state["load_seconds"]
+    }
+    if analyze.model_state["error"]:
+        content["error"] = analyze.model_state["error"]
+    return JSONResponse(status_code=200 if status == "ready" else 503, content=content)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    if not settings.METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/api/classes")
 async def get_classes():
     classes = {
@@ -74,6 +134,51 @@ async def get_classes():
     }
     return classes
 
+def serve_preforked(workers: int):
+    """Loads the model once, then forks `workers` servers sharing it and one listening socket.
+
+    uvicorn's own --workers spawns fresh interpreters, which would each load
+    the weights again; forking after the load keeps them in shared
+    copy-on-write pages instead.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((settings.HOST, settings.PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    
+    analyze.preload_model()
+    
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            config = uvicorn.Config(app, host=settings.HOST, port=settings.PORT, reload=False)
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        children.append(pid)
+    print(f"  Forked {workers} workers sharing the preloaded model: {children}")
+    
+    def stop(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for child in children:
+        while True:
+            try:
+                os.waitpid(child, 0)
+                break
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+
 if __name__ == "__main__":
     print("\n" + "="*60)
     print("  Starting AlphaDent Backend Server...")
@@ -81,9 +186,19 @@ if __name__ == "__main__":
     print(f"  Port: {settings.PORT}")
     print(f"  Host: {settings.HOST}")
     print(f"  Debug mode: {settings.DEBUG}")
+    print(f"  Workers: {settings.WORKERS}{' (preloaded model)' if settings.PRELOAD_MODEL and settings.WORKERS > 1 else ''}")
     print("="*60 + "\n")
     
-    if settings.DEBUG:
+    if settings.WORKERS > 1 and settings.PRELOAD_MODEL and hasattr(os, "fork"):
+        serve_preforked(settings.WORKERS)
+    elif settings.WORKERS > 1:
+        uvicorn.run(
+            "main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            workers=settings.WORKERS
+        )
+    elif settings.DEBUG:
         uvicorn.run(
             "main:app",
             host=settings.HOST,
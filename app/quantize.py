@@ -0,0 +1,316 @@
+"""
+Post-training INT8 Quantization
+
+Turns an exported FP32 ONNX model (YOLO.export(format='onnx')) into INT8
+models for the CPU backend and reports what was gained and lost:
+
+  - static:  QDQ, per-channel INT8 weights, activation ranges calibrated on
+             a sample of the validation split from the data YAML
+  - dynamic: INT8 weights, activation ranges computed at run time
+
+Each model is loaded through DentalPathologyModel(backend="onnx") exactly as
+the server would load it, then measured for latency, resident memory, file
+size and segmentation mAP@50, both against the validation labels and
+against the FP32 model's own predictions.
+
+Usage:
+    python quantize.py --model runs/segment/train/weights/best.onnx --data data.yaml
+    python quantize.py --model best.onnx --data data.yaml --modes static --report quant.json
+
+Serve the result with MODEL_BACKEND=onnx and MODEL_PATH pointing at it.
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from services.inference import DentalPathologyModel
+from services.onnx_backend import OnnxSegmentationModel
+from utils.evaluation import MaskMAP50, label_path_for, load_yolo_labels
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+MODES = ("static", "dynamic")
+
+def validation_images(data_yaml):
+    """Validation image paths and class count from a YOLO data YAML"""
+    import yaml
+
+    data_yaml = Path(data_yaml)
+    config = yaml.safe_load(data_yaml.read_text())
+    root = Path(config.get("path") or data_yaml.parent)
+    if not root.is_absolute():
+        root = (data_yaml.parent / root).resolve()
+
+    val = config.get("val")
+    if not val:
+        raise ValueError(f"No 'val' split in {data_yaml}")
+
+    images = []
+    for entry in val if isinstance(val, list) else [val]:
+        directory = Path(entry) if Path(entry).is_absolute() else root / entry
+        if not directory.is_dir():
+            raise FileNotFoundError(f"Validation images directory not found: {directory}")
+        images.extend(p for p in directory.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+    names = config.get("names") or {}
+    num_classes = int(config.get("nc") or len(names))
+    return sorted(images), num_classes
+
+def sample(paths, count, seed):
+    if count <= 0 or count >= len(paths):
+        return list(paths)
+    return sorted(random.Random(seed).sample(list(paths), count))
+
+class LetterboxCalibrationReader:
+    """Feeds calibration images to onnxruntime, preprocessed exactly as at serve time"""
+
+    def __init__(self, model_path, image_paths):
+        # Reuse the serving letterbox so calibrated ranges match real inputs
+        self.preprocessor = OnnxSegmentationModel(model_path)
+        self.input_name = self.preprocessor.input_name
+        self.image_paths = list(image_paths)
+        self._iterator = None
+
+    def get_next(self):
+        if self._iterator is None:
+            self._iterator = iter(self.image_paths)
+        for path in self._iterator:
+            image = cv2.imread(str(path))
+            if image is None:
+                print(f"   ⚠️  Skipping unreadable calibration image: {path}")
+                continue
+            tensor, _ = self.preprocessor.letterbox(image)
+            return {self.input_name: tensor[None]}
+        return None
+
+    def rewind(self):
+        self._iterator = None
+
+def preprocess_for_quantization(model_path, output_dir):
+    """Shape inference + graph optimization before quantizing, as onnxruntime recommends"""
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    prepared = Path(output_dir) / f"{Path(model_path).stem}_prep.onnx"
+    try:
+        quant_pre_process(str(model_path), str(prepared), skip_symbolic_shape=True)
+        return prepared
+    except Exception as e:
+        print(f"   ⚠️  Pre-processing failed ({e}); quantizing the original graph")
+        return Path(model_path)
+
+def quantize_static_model(model_path, output_path, calibration_paths, method):
+    from onnxruntime.quantization import (CalibrationMethod, QuantFormat, QuantType,
+                                          quantize_static)
+
+    reader = LetterboxCalibrationReader(model_path, calibration_paths)
+    quantize_static(
+        str(model_path),
+        str(output_path),
+        reader,
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        calibrate_method=getattr(CalibrationMethod, method)
+    )
+
+def quantize_dynamic_model(model_path, output_path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(str(model_path), str(output_path), weight_type=QuantType.QInt8)
+
+def resident_mb():
+    """Current resident set size in MB (Linux; 0 elsewhere)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+def evaluate(model_path, images, num_classes, threads, runs, conf, iou, reference=None):
+    """Latency, memory and mAP@50 of one model; returns (report, predictions per image)"""
+    gc.collect()
+    before = resident_mb()
+    start = time.perf_counter()
+    model = DentalPathologyModel(str(model_path), backend="onnx", num_threads=threads)
+    load_seconds = time.perf_counter() - start
+    model.warmup()
+    loaded = resident_mb()
+
+    against_labels = MaskMAP50(num_classes)
+    against_reference = MaskMAP50(num_classes) if reference is not None else None
+    latencies = []
+    predictions = []
+
+    for index, (path, image) in enumerate(images):
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = model.predict(image, conf_threshold=conf, iou_threshold=iou)
+            latencies.append((time.perf_counter() - start) * 1000)
+        predictions.append(result)
+
+        against_labels.add(result, load_yolo_labels(label_path_for(path)), image.shape)
+        if against_reference is not None:
+            against_reference.add(result, reference[index], image.shape)
+
+    peak = resident_mb()
+    latencies.sort()
+    report = {
+        "model": str(model_path),
+        "file_mb": round(Path(model_path).stat().st_size / (1024 * 1024), 2),
+        "load_seconds": round(load_seconds, 3),
+        "rss_model_mb": round(loaded - before, 1),
+        "rss_peak_mb": round(peak - before, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 2),
+            "p50": round(latencies[len(latencies) // 2], 2),
+            "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2)
+        },
+        "detections": sum(len(p) for p in predictions),
+        "map50": round(against_labels.map50(), 4),
+        "map50_per_class": {c: (round(ap, 4) if ap is not None else None) for c, ap in against_labels.per_class().items()}
+    }
+    if against_reference is not None:
+        report["map50_vs_fp32"] = round(against_reference.map50(), 4)
+
+    del model
+    gc.collect()
+    return report, predictions
+
+def print_table(reports):
+    fp32 = reports["fp32"]
+    print(f"\n{'='*74}")
+    print(f"  {'Model':<14}{'Size MB':>9}{'RSS MB':>9}{'p50 ms':>9}{'p95 ms':>9}{'Speedup':>9}{'mAP50':>8}{'vs FP32':>8}")
+    print(f"{'='*74}")
+    for name, report in reports.items():
+        speedup = fp32["latency_ms"]["p50"] / max(report["latency_ms"]["p50"], 1e-9)
+        agreement = report.get("map50_vs_fp32")
+        print(f"  {name:<14}{report['file_mb']:>9.1f}{report['rss_model_mb']:>9.1f}"
+              f"{report['latency_ms']['p50']:>9.1f}{report['latency_ms']['p95']:>9.1f}"
+              f"{speedup:>8.2f}x{report['map50']:>8.3f}"
+              f"{(f'{agreement:.3f}' if agreement is not None else '-'):>8}")
+    print(f"{'='*74}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize an exported ONNX model to INT8 and compare it with FP32")
+    parser.add_argument("--model", required=True, help="FP32 ONNX model (YOLO.export(format='onnx'))")
+    parser.add_argument("--data", required=True, help="Dataset YAML; calibration and evaluation use its 'val' split")
+    parser.add_argument("--output-dir", default=None, help="Where to write INT8 models (default: next to --model)")
+    parser.add_argument("--modes", default="static,dynamic", help="Comma-separated: static, dynamic")
+    parser.add_argument("--calib-images", type=int, default=100, help="Validation images used for calibration")
+    parser.add_argument("--calibrate-method", default="MinMax", choices=["MinMax", "Entropy", "Percentile"],
+                        help="Static calibration method")
+    parser.add_argument("--eval-images", type=int, default=200, help="Validation images for latency/mAP (0 = all)")
+    parser.add_argument("--runs", type=int, default=1, help="Timed predictions per evaluation image")
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (0 = onnxruntime default)")
+    parser.add_argument("--conf", type=float, default=0.25, help="Confidence threshold")
+    parser.add_argument("--iou", type=float, default=0.45, help="NMS IoU threshold")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for sampling calibration/evaluation images")
+    parser.add_argument("--report", default=None, help="Write the comparison as JSON to this path")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"Unknown mode(s): {', '.join(unknown)}; choose from {', '.join(MODES)}")
+
+    try:
+        import onnxruntime.quantization  # noqa: F401
+    except ImportError:
+        print("❌ onnxruntime is not installed. Install with: pip install onnxruntime onnx")
+        sys.exit(1)
+
+    model_path = Path(args.model)
+    if not model_path.exists():
+        print(f"❌ Model not found: {model_path}")
+        sys.exit(1)
+    output_dir = Path(args.output_dir) if args.output_dir else model_path.parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    images, num_classes = validation_images(args.data)
+    if not images:
+        print(f"❌ No validation images found via {args.data}")
+        sys.exit(1)
+    calibration = sample(images, args.calib_images, args.seed)
+    evaluation = sample(images, args.eval_images, args.seed + 1)
+
+    print(f"\n{'='*70}")
+    print(f"  INT8 Quantization")
+    print(f"{'='*70}")
+    print(f"📦 Model:       {model_path}")
+    print(f"📊 Validation:  {len(images)} images, {num_classes} classes")
+    print(f"🎯 Calibration: {len(calibration)} images ({args.calibrate_method})")
+    print(f"🧪 Evaluation:  {len(evaluation)} images x {args.runs} run(s)\n")
+
+    outputs = {}
+    prepared = preprocess_for_quantization(model_path, output_dir)
+    for mode in modes:
+        output_path = output_dir / f"{model_path.stem}_int8_{mode}.onnx"
+        print(f"⚙️  Quantizing ({mode}) -> {output_path}")
+        start = time.perf_counter()
+        if mode == "static":
+            quantize_static_model(prepared, output_path, calibration, args.calibrate_method)
+        else:
+            quantize_dynamic_model(prepared, output_path)
+        print(f"   ✅ Done in {time.perf_counter() - start:.1f}s")
+        outputs[f"int8_{mode}"] = output_path
+    if prepared != model_path:
+        prepared.unlink(missing_ok=True)
+
+    loaded_images = []
+    for path in evaluation:
+        image = cv2.imread(str(path))
+        if image is None:
+            print(f"   ⚠️  Skipping unreadable image: {path}")
+            continue
+        loaded_images.append((path, image))
+
+    print(f"\n⏱️  Evaluating fp32...")
+    reports = {}
+    reports["fp32"], reference = evaluate(model_path, loaded_images, num_classes, args.threads, args.runs,
+                                          args.conf, args.iou)
+    for name, path in outputs.items():
+        print(f"⏱️  Evaluating {name}...")
+        try:
+            reports[name], _ = evaluate(path, loaded_images, num_classes, args.threads, args.runs,
+                                        args.conf, args.iou, reference=reference)
+        except Exception as e:
+            # Some graphs quantize fine but use INT8 kernels this onnxruntime build lacks
+            print(f"   ❌ Could not run {name}: {e}")
+
+    print_table(reports)
+
+    if args.report:
+        payload = {
+            "source": str(model_path),
+            "data": str(args.data),
+            "calibration_images": len(calibration),
+            "calibrate_method": args.calibrate_method,
+            "evaluation_images": len(loaded_images),
+            "runs": args.runs,
+            "threads": args.threads,
+            "models": reports
+        }
+        Path(args.report).write_text(json.dumps(payload, indent=2))
+        print(f"💾 Report saved to {args.report}")
+
+    print("To serve an INT8 model:")
+    for name, path in outputs.items():
+        if name in reports:
+            print(f"   MODEL_BACKEND=onnx MODEL_PATH={path}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, File, UploadFile, HTTPException, Request, Header
+from fastapi.responses import Response, StreamingResponse, PlainTextResponse, FileResponse
 import aiofiles
+import asyncio
 import os
 import sys
+import threading
+import time
+import uuid
 
 # Add parent directory (app folder) to path for imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -11,8 +15,22 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 from config import settings
-from utils.image_processing import validate_image
-from typing import List, Dict
+from utils.image_processing import (
+    validate_image, decode_image, decode_image_reduced, validate_image_array,
+    probe_image, is_valid_probe, display_size, IDENTITY_TRANSFORM
+)
+from utils.polygon_utils import remap_predictions, rescale_rle_masks
+from utils.upload import read_upload, UploadTooLarge, UnsupportedUpload
+from utils.encoding import negotiate, encode_json, encode_response
+from services.batching import MicroBatcher
+from services.executor import InferenceExecutor, InferenceQueueFull
+from services.cache import content_hash, create_result_cache, make_cache_key
+from services.registry import ModelRegistry, ModelVersion, version_id, read_desired_version, write_desired_version
+from services import metrics, profiling
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+from pydantic import BaseModel
+import functools
 
 try:
     from services.inference import DentalPathologyModel
@@ -20,76 +38,596 @@ try:
 except ImportError:
     MODEL_AVAILABLE = False
 
+from services.synthetic import SyntheticModel
+from services.worker_pool import ProcessInferencePool
+from services import preload
+
 router = APIRouter()
 
-model_instance = None
+OUTPUT_FORMATS = ("polygon", "rle")
 
-def get_model():
+model_instance = None  # the active version's model
+model_registry = ModelRegistry(history=settings.MODEL_REGISTRY_HISTORY)
+inference_executor = InferenceExecutor(
+    # Every pool worker needs a dispatching thread to stay busy
+    max_concurrency=max(settings.INFERENCE_CONCURRENCY, settings.INFERENCE_WORKERS),
+    max_queue=settings.INFERENCE_QUEUE_SIZE
+)
+# Decoding and hashing uploads; bounded so a burst cannot hold more full-size images than this at once
+decode_pool = ThreadPoolExecutor(
+    max_workers=settings.DECODE_WORKERS or min(4, os.cpu_count() or 1),
+    thread_name_prefix="decode"
+)
+result_cache = create_result_cache(
+    settings.RESULT_CACHE_BACKEND,
+    max_entries=settings.RESULT_CACHE_SIZE,
+    ttl_seconds=settings.RESULT_CACHE_TTL,
+    redis_url=settings.REDIS_URL
+) if settings.RESULT_CACHE_ENABLED else None
+
+model_state = {"status": "idle", "error": None, "load_seconds": None}
+preload_snapshot = {}
+model_lock = threading.Lock()
+
+metrics.INFERENCE_ACTIVE.callback = lambda: inference_executor.active
+metrics.QUEUE_DEPTH.callback = lambda: inference_executor.queued + model_registry.batched_queue_depth()
+
+def build_model(model_path: str, warmup: bool = True):
+    if settings.INFERENCE_WORKERS > 0:
+        return ProcessInferencePool(
+            model_path,
+            workers=settings.INFERENCE_WORKERS,
+            backend=settings.MODEL_BACKEND,
+            imgsz=settings.MODEL_IMGSZ,
+            polygon_mode=settings.POLYGON_MODE,
+            tile_workers=settings.TILE_WORKERS,
+            threads_per_worker=settings.INFERENCE_WORKER_THREADS,
+            pin_cores=settings.INFERENCE_PIN_CORES,
+            slot_mb=settings.INFERENCE_WORKER_SLOT_MB,
+            call_timeout=settings.INFERENCE_WORKER_TIMEOUT,
+            warmup_sizes=settings.WARMUP_IMAGE_SIZES,
+            tuning_profile=settings.TUNING_PROFILE
+        )
+    
+    model = DentalPathologyModel(
+        model_path,
+        backend=settings.MODEL_BACKEND,
+        imgsz=settings.MODEL_IMGSZ,
+        polygon_mode=settings.POLYGON_MODE,
+        tile_workers=settings.TILE_WORKERS,
+        num_threads=settings.INFERENCE_THREADS,
+        inter_op_threads=settings.INFERENCE_INTER_OP_THREADS,
+        tuning_profile=settings.TUNING_PROFILE
+    )
+    if warmup:
+        model.warmup(settings.WARMUP_IMAGE_SIZES)
+    return model
+
+def activate_model(model, model_path: str, version: str, load_seconds: Optional[float] = None):
+    global model_instance
+    model_registry.activate(ModelVersion(version, model_path, model, load_seconds))
+    model_instance = model
+
+def load_model(warmup: bool = True):
     global model_instance
-    if not MODEL_AVAILABLE:
+    with model_lock:
+        if model_state["status"] in ("ready", "failed", "preloaded"):
+            return model_instance
+        
+        model_state["status"] = "loading"
+        model_state["error"] = None
+        start = time.perf_counter()
+        
+        if settings.MODEL_BACKEND == "synthetic":
+            model = SyntheticModel(
+                latency_ms=settings.SYNTHETIC_LATENCY_MS,
+                jitter=settings.SYNTHETIC_LATENCY_JITTER,
+                mode=settings.SYNTHETIC_LATENCY_MODE,
+                batch_latency_ms=settings.SYNTHETIC_BATCH_LATENCY_MS,
+                max_detections=settings.SYNTHETIC_MAX_DETECTIONS,
+                polygon_points=settings.SYNTHETIC_POLYGON_POINTS,
+                imgsz=settings.MODEL_IMGSZ
+            )
+            activate_model(model, settings.MODEL_PATH, "synthetic", 0.0)
+            model_state["status"] = "ready"
+            model_state["load_seconds"] = 0.0
+            print(f"Using synthetic model ({settings.SYNTHETIC_LATENCY_MS}ms, {settings.SYNTHETIC_LATENCY_MODE})")
+            return model_instance
+        
+        if not MODEL_AVAILABLE or not os.path.exists(settings.MODEL_PATH):
+            print(f"Warning: Model not found at {settings.MODEL_PATH}. Using mock predictions.")
+            model_state["status"] = "ready"
+            return None
+        
+        try:
+            model = build_model(settings.MODEL_PATH, warmup=warmup)
+            model_state["status"] = "ready"
+            model_state["load_seconds"] = round(time.perf_counter() - start, 3)
+            activate_model(model, settings.MODEL_PATH, version_id(settings.MODEL_PATH), model_state["load_seconds"])
+            metrics.MODEL_LOAD_SECONDS.set(model_state["load_seconds"])
+            print(f"Model loaded successfully from {settings.MODEL_PATH} ({settings.MODEL_BACKEND} backend) "
+                  f"in {model_state['load_seconds']}s")
+        except Exception as e:
+            print(f"Error loading model: {e}. Using mock predictions.")
+            model_state["status"] = "failed"
+            model_state["error"] = str(e)
+        return model_instance
+
+def preload_model():
+    """Loads and freezes the model in the parent so forked workers share its weights copy-on-write."""
+    global preload_snapshot
+    if settings.MODEL_BACKEND == "onnx" or settings.INFERENCE_WORKERS > 0:
+        # ONNX Runtime starts its thread pools on load and the worker pool owns pipes; neither survives fork()
+        print("Warning: PRELOAD_MODEL only applies to the torch backend without INFERENCE_WORKERS; "
+              "workers will load their own model.")
         return None
     
-    if model_instance is None:
-        if not os.path.exists(settings.MODEL_PATH):
-            print(f"Warning: Model not found at {settings.MODEL_PATH}. Using mock predictions.")
-            model_instance = None
-        else:
-            try:
-                model_instance = DentalPathologyModel(settings.MODEL_PATH)
-                print(f"Model loaded successfully from {settings.MODEL_PATH}")
-            except Exception as e:
-                print(f"Error loading model: {e}. Using mock predictions.")
-                model_instance = None
+    model = load_model(warmup=False)
+    if model is not None:
+        preload_snapshot = preload.freeze_for_sharing(model)
+        model_state["status"] = "preloaded"
+        print(f"Model preloaded for sharing ({len(preload_snapshot)} frozen tensors)")
+    return model
+
+def finish_preload():
+    """Runs in each forked worker: thread setup and warmup, then marks the worker ready."""
+    try:
+        preload.configure_worker(model_instance, settings.WORKERS, settings.WORKER_THREADS)
+        model_instance.warmup(settings.WARMUP_IMAGE_SIZES)
+    except Exception as e:
+        print(f"Error warming up preloaded model: {e}")
+        model_state["status"] = "failed"
+        model_state["error"] = str(e)
+        return
+    
+    modified = preload.modified_tensors(model_instance, preload_snapshot)
+    if modified:
+        print(f"Warning: {len(modified)} shared weight tensors were modified after fork "
+              f"(e.g. {modified[0]}); their pages are no longer shared.")
+    model_state["status"] = "ready"
+
+def swap_model(model_path: str, version: str) -> bool:
+    """Loads and warms ``model_path`` off the serving path, then makes it the active version.
+
+    Requests already running finish on the version they started with; the
+    old version is retired when its last one completes.
+    """
+    start = time.perf_counter()
+    try:
+        model = build_model(model_path)
+        load_seconds = round(time.perf_counter() - start, 3)
+        activate_model(model, model_path, version, load_seconds)
+        model_registry.last_error = None
+        metrics.MODEL_LOAD_SECONDS.set(load_seconds)
+        print(f"Model version {version} loaded from {model_path} in {load_seconds}s and activated")
+        return True
+    except Exception as e:
+        print(f"Error loading model version {version}: {e}. Keeping the current version.")
+        model_registry.last_error = f"{version}: {e}"
+        return False
+    finally:
+        model_registry.end_loading()
+
+def model_sync_enabled() -> bool:
+    return settings.WORKERS > 1 and settings.MODEL_BACKEND != "synthetic"
+
+async def sync_model_version():
+    """Runs in each server process when WORKERS>1: follows the version any process was asked to load.
+
+    /api/models/load only reaches the process that accepted the request; it
+    records the version in MODEL_SYNC_PATH and the others swap on their
+    next check. A version that failed to load here is not retried until a
+    new load is requested.
+    """
+    loop = asyncio.get_running_loop()
+    failed = None
+    while True:
+        await asyncio.sleep(settings.MODEL_SYNC_INTERVAL)
+        try:
+            desired = await loop.run_in_executor(None, read_desired_version, settings.MODEL_SYNC_PATH)
+            if desired is None or desired == failed or model_state["status"] != "ready":
+                continue
+            active = model_registry.active
+            if active is not None and active.version == desired["version"]:
+                continue
+            if not os.path.isfile(desired["path"]) or not model_registry.begin_loading(desired["version"]):
+                continue
+            
+            print(f"Following model version {desired['version']} requested through another worker")
+            loaded = await loop.run_in_executor(None, swap_model, desired["path"], desired["version"])
+            failed = None if loaded else desired
+        except Exception as e:
+            print(f"Model version sync failed: {e}")
+
+def get_model():
+    if model_state["status"] == "idle":
+        return load_model()
     return model_instance
 
+def get_batcher(version: ModelVersion, output: str = "polygon"):
+    if version is None or version.model is None or not settings.BATCHING_ENABLED:
+        return None
+    
+    if output not in version.batchers:
+        version.batchers[output] = MicroBatcher(
+            functools.partial(
+                version.model.predict_batch,
+                conf_threshold=settings.MODEL_CONF_THRESHOLD,
+                iou_threshold=settings.MODEL_IOU_THRESHOLD,
+                output=output
+            ),
+            max_batch_size=settings.BATCH_MAX_SIZE or getattr(version.model, "tuned_batch_size", None) or 8,
+            max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+            executor=inference_executor,
+            # One batch per pool worker, or as many as the executor runs in-process
+            max_concurrent_batches=min(getattr(version.model, "workers", None) or inference_executor.max_concurrency,
+                                       inference_executor.max_concurrency)
+        )
+    return version.batchers[output]
+
+def resolve_output(value: Optional[str]) -> str:
+    """``?output=`` value: "polygon" (default) or "rle" for bbox-cropped run-length masks."""
+    output = (value or "polygon").lower()
+    if output not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown output format: {value} (expected one of {', '.join(OUTPUT_FORMATS)})")
+    if output == "rle" and settings.TILED_INFERENCE:
+        # Tiles are merged by polygon overlap, so tiled results only come as polygons
+        raise HTTPException(status_code=400, detail="output=rle is not available with tiled inference")
+    return output
+
 @router.post("/analyze")
-async def analyze_image(file: UploadFile = File(...)):
+async def analyze_image(request: Request, file: UploadFile = File(...)):
+    start = time.perf_counter()
+    status = 500
+    profile_mode = profiling.resolve_mode(
+        request.query_params.get("profile") or request.headers.get("x-profile"),
+        request.headers.get("x-profile-token"),
+        settings.PROFILING_ENABLED,
+        settings.PROFILING_TOKEN
+    )
+    media_type = negotiate(request.headers.get("accept"))
+    try:
+        output = resolve_output(request.query_params.get("output"))
+        with metrics.IN_FLIGHT.track():
+            if profile_mode is None:
+                response = await _analyze_image(file, media_type, output)
+            else:
+                response = await _profile_analyze_image(file, media_type, output, profile_mode, start)
+        status = response.status_code
+        return response
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint="analyze", status=str(status))
+
+async def _profile_analyze_image(file: UploadFile, media_type: str, output: str, mode: str, start: float) -> Response:
+    """Runs one analysis with a profile timeline active and reports it in Server-Timing."""
+    with profiling.activate(profiling.Timeline(mode)) as timeline:
+        response = await _analyze_image(file, media_type, output)
+    
+    timeline.add("total", time.perf_counter() - start)
+    response.headers["Server-Timing"] = timeline.server_timing()
+    
+    if profiling.save_profile(timeline, settings.PROFILING_DIR, keep=settings.PROFILING_KEEP):
+        response.headers["X-Profile-Id"] = timeline.profile_id
+    return response
+
+async def _analyze_image(file: UploadFile, media_type: str, output: str) -> Response:
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
     if file.size and file.size > settings.MAX_FILE_SIZE:
         raise HTTPException(
-            status_code=400,
+            status_code=413,
             detail=f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE / 1024 / 1024}MB"
         )
     
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    file_path = os.path.join(settings.UPLOAD_DIR, file.filename)
+    if model_state["status"] == "loading":
+        raise HTTPException(
+            status_code=503,
+            detail="Model is still loading. Please retry shortly.",
+            headers={"Retry-After": "5"}
+        )
     
     try:
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        if not validate_image(file_path):
-            os.remove(file_path)
-            raise HTTPException(status_code=400, detail="Invalid image file")
+        try:
+            with metrics.stage("upload"):
+                content, digest = await read_upload(file, settings.MAX_FILE_SIZE, settings.UPLOAD_CHUNK_SIZE)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except UnsupportedUpload as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        model = get_model()
+        predictions, cache_status, model_version = await run_analysis(content, file.filename, digest, output)
         
-        if model is None:
-            predictions = generate_mock_predictions()
-        else:
-            predictions = model.predict(
-                file_path,
-                conf_threshold=settings.MODEL_CONF_THRESHOLD
-            )
-        
-        os.remove(file_path)
-        
-        return JSONResponse(content={
-            "success": True,
-            "predictions": predictions,
-            "image_name": file.filename
-        })
+        with metrics.stage("serialize"):
+            body, media_type = encode_response({
+                "success": True,
+                "predictions": predictions,
+                "image_name": file.filename,
+                "model_version": model_version
+            }, media_type)
+            return Response(content=body, media_type=media_type,
+                            headers={"X-Cache": cache_status, "X-Model-Version": model_version, "Vary": "Accept"})
     
     except HTTPException:
         raise
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=settings.QUEUE_FULL_STATUS_CODE,
+            detail="Server is busy analyzing other images. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
-        if os.path.exists(file_path):
-            os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@router.post("/analyze/batch")
+async def analyze_batch(request: Request, files: List[UploadFile] = File(...)):
+    output = resolve_output(request.query_params.get("output"))
+    if model_state["status"] == "loading":
+        raise HTTPException(
+            status_code=503,
+            detail="Model is still loading. Please retry shortly.",
+            headers={"Retry-After": "5"}
+        )
+    if len(files) > settings.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many files: {len(files)} (at most {settings.BATCH_MAX_FILES} per request)"
+        )
+    
+    uploads = []
+    for file in files:
+        if not file.content_type or not file.content_type.startswith("image/"):
+            uploads.append((file.filename, None, None, "File must be an image"))
+            continue
+        try:
+            content, digest = await read_upload(file, settings.MAX_FILE_SIZE, settings.UPLOAD_CHUNK_SIZE)
+        except (UploadTooLarge, UnsupportedUpload) as e:
+            uploads.append((file.filename, None, None, str(e)))
+            continue
+        uploads.append((file.filename, content, digest, None))
+    
+    # Images beyond this wait here instead of taking every inference slot and rejecting each other
+    in_flight = asyncio.Semaphore(batch_request_concurrency())
+    
+    async def analyze_one(index: int, filename: str, content: bytes, digest: str, error: str) -> Dict:
+        line = {"index": index, "image_name": filename}
+        if error is not None:
+            return {**line, "success": False, "error": error}
+        try:
+            async with in_flight:
+                predictions, cache_status, model_version = await run_analysis(content, filename, digest, output)
+            return {**line, "success": True, "predictions": predictions, "cache": cache_status,
+                    "model_version": model_version}
+        except HTTPException as e:
+            return {**line, "success": False, "error": e.detail, "status_code": e.status_code}
+        except InferenceQueueFull as e:
+            return {**line, "success": False, "error": "Server is busy", "status_code": settings.QUEUE_FULL_STATUS_CODE,
+                    "retry_after": e.retry_after}
+        except Exception as e:
+            return {**line, "success": False, "error": f"Analysis failed: {str(e)}", "status_code": 500}
+    
+    async def stream_results():
+        start = time.perf_counter()
+        metrics.IN_FLIGHT.inc()
+        tasks = [asyncio.ensure_future(analyze_one(i, *upload)) for i, upload in enumerate(uploads)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield encode_json(await finished) + b"\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+            metrics.IN_FLIGHT.dec()
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint="analyze_batch", status="200")
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+def batch_request_concurrency() -> int:
+    """Images one batch request may have in flight; always leaves room in the queue for other requests."""
+    limit = settings.BATCH_REQUEST_CONCURRENCY or inference_executor.max_pending // 2
+    return max(1, min(limit, inference_executor.max_pending - 1))
+
+async def run_analysis(content: bytes, filename: str, digest: Optional[str] = None, output: str = "polygon"):
+    """Runs one upload on the active model version; returns (predictions, X-Cache value, model version)."""
+    get_model()
+    version = model_registry.acquire()
+    try:
+        predictions, cache_status = await _run_analysis(content, filename, digest, version, output)
+    finally:
+        model_registry.release(version)
+    return predictions, cache_status, version.version if version is not None else "mock"
+
+async def _run_analysis(content: bytes, filename: str, digest: Optional[str], version: Optional[ModelVersion],
+                        output: str = "polygon"):
+    with metrics.stage("validate"):
+        info = probe_image(content)
+    if info is not None and not is_valid_probe(info):
+        raise HTTPException(status_code=400, detail="Invalid or truncated image file")
+    
+    model = version.model if version is not None else None
+    cache_key = None
+    file_path = None
+    profiled = profiling.current() is not None
+    
+    # Profiled requests skip the cache and the batcher so the timeline covers this image only
+    if model is not None and result_cache is not None and not profiled:
+        if digest is None:
+            digest = await asyncio.get_running_loop().run_in_executor(decode_pool, content_hash, content)
+        cache_key = make_cache_key(
+            digest,
+            version.weights_id,
+            settings.MODEL_CONF_THRESHOLD,
+            settings.MODEL_IOU_THRESHOLD,
+            settings.POLYGON_MODE,
+            output,
+            f"reduced:{settings.REDUCED_DECODE}",
+            f"tiled:{settings.TILE_SIZE}:{settings.TILE_OVERLAP}" if settings.TILED_INFERENCE else "full"
+        )
+        with metrics.stage("cache_lookup"):
+            cached = await result_cache.aget(cache_key)
+        if cached is not None:
+            _record_analysis(cached, "HIT")
+            return cached, "HIT"
+    
+    transform = IDENTITY_TRANSFORM
+    loop = asyncio.get_running_loop()
+    
+    try:
+        # Admitted before decoding, so under overload a request is turned away
+        # before its full-size image is ever allocated
+        async with inference_executor.admit():
+            with metrics.stage("decode"):
+                if settings.UPLOAD_SPOOL_TO_DISK:
+                    file_path = await spool_upload(content, filename)
+                    if not validate_image(file_path):
+                        raise HTTPException(status_code=400, detail="Invalid image file")
+                    source = file_path
+                elif model is not None and settings.REDUCED_DECODE and not settings.TILED_INFERENCE:
+                    source, transform = await loop.run_in_executor(
+                        decode_pool, decode_image_reduced, content, model.imgsz or model.default_imgsz
+                    )
+                    if not validate_image_array(source):
+                        raise HTTPException(status_code=400, detail="Invalid image file")
+                else:
+                    source = await loop.run_in_executor(decode_pool, decode_image, content)
+                    if not validate_image_array(source):
+                        raise HTTPException(status_code=400, detail="Invalid image file")
+            
+            if model is None:
+                predictions = generate_mock_predictions()
+                _record_analysis(predictions, "BYPASS")
+                return predictions, "BYPASS"
+            
+            batcher = get_batcher(version, output) if not profiled else None
+            with metrics.stage("inference"):
+                if settings.TILED_INFERENCE:
+                    predictions = await inference_executor.run(
+                        profiling.call,
+                        model.predict_tiled,
+                        source,
+                        conf_threshold=settings.MODEL_CONF_THRESHOLD,
+                        iou_threshold=settings.MODEL_IOU_THRESHOLD,
+                        tile_size=settings.TILE_SIZE,
+                        overlap=settings.TILE_OVERLAP,
+                        tile_batch=settings.TILE_BATCH_SIZE
+                    )
+                elif batcher is not None:
+                    predictions = await batcher.submit(source)
+                else:
+                    predictions = await inference_executor.run(
+                        profiling.call,
+                        model.predict,
+                        source,
+                        conf_threshold=settings.MODEL_CONF_THRESHOLD,
+                        iou_threshold=settings.MODEL_IOU_THRESHOLD,
+                        output=output
+                    )
+    finally:
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+    
+    with metrics.stage("remap"):
+        predictions = remap_predictions(predictions, transform)
+        if output == "rle" and settings.POLYGON_MODE == "full" and info is not None:
+            # After a reduced decode, full-resolution masks are at the decoded size; bring them to the photo's
+            width, height = display_size(info)
+            predictions = await loop.run_in_executor(decode_pool, rescale_rle_masks, predictions, width, height)
+    
+    if cache_key is not None:
+        await result_cache.aset(cache_key, predictions)
+        _record_analysis(predictions, "MISS")
+        return predictions, "MISS"
+    _record_analysis(predictions, "BYPASS")
+    return predictions, "BYPASS"
+
+def _record_analysis(predictions: List[Dict], cache_status: str):
+    metrics.ANALYSES.inc(cache=cache_status)
+    metrics.DETECTIONS.observe(len(predictions))
+
+async def spool_upload(content: bytes, filename: str) -> str:
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4().hex}_{os.path.basename(filename or 'upload')}")
+    async with aiofiles.open(file_path, 'wb') as f:
+        await f.write(content)
+    return file_path
+
+class ModelLoadRequest(BaseModel):
+    path: str
+    version: Optional[str] = None
+
+@router.get("/models")
+async def list_models():
+    """Versions in the process that answers; with WORKERS>1, "desired" is what all processes converge on."""
+    active = model_registry.active
+    response = {
+        "active": active.version if active is not None else None,
+        "loading": model_registry.loading,
+        "last_error": model_registry.last_error,
+        "versions": model_registry.versions(),
+        "pid": os.getpid()
+    }
+    if model_sync_enabled():
+        desired = read_desired_version(settings.MODEL_SYNC_PATH)
+        response["desired"] = desired["version"] if desired is not None else None
+    return response
+
+@router.post("/models/load", status_code=202)
+async def load_model_version(body: ModelLoadRequest, x_admin_token: Optional[str] = Header(None)):
+    if not settings.MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Model management is disabled")
+    if x_admin_token != settings.MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    if settings.MODEL_BACKEND == "synthetic":
+        raise HTTPException(status_code=400, detail="The synthetic backend has no weights to swap")
+    
+    model_dir = os.path.realpath(settings.MODEL_DIR)
+    model_path = os.path.realpath(os.path.join(model_dir, body.path))
+    if os.path.commonpath([model_dir, model_path]) != model_dir:
+        raise HTTPException(status_code=400, detail=f"Model path must be inside {settings.MODEL_DIR}")
+    if not os.path.isfile(model_path):
+        raise HTTPException(status_code=404, detail=f"Model file not found: {body.path}")
+    
+    version = body.version or version_id(model_path)
+    active = model_registry.active
+    if active is not None and active.version == version:
+        raise HTTPException(status_code=409, detail=f"Version {version} is already active")
+    if not model_registry.begin_loading(version):
+        raise HTTPException(status_code=409, detail=f"Version {model_registry.loading} is still loading")
+    
+    if model_sync_enabled():
+        try:
+            write_desired_version(settings.MODEL_SYNC_PATH, version, model_path)
+        except OSError as e:
+            model_registry.end_loading()
+            raise HTTPException(status_code=500, detail=f"Could not record the version for other workers: {e}")
+    
+    asyncio.get_running_loop().run_in_executor(None, swap_model, model_path, version)
+    return {"loading": version, "path": model_path, "all_workers": model_sync_enabled()}
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "text", sort: str = "cumulative", limit: int = 40):
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    
+    path = profiling.profile_path(profile_id, settings.PROFILING_DIR)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    if format == "raw":
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    try:
+        return PlainTextResponse(profiling.format_profile(path, sort=sort, limit=limit))
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort}")
+
+@router.get("/cache/stats")
+async def cache_stats():
+    if result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **result_cache.stats()}
+
 def generate_mock_predictions() -> List[Dict]:
     import random
     mock_predictions = []
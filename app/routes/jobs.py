@@ -0,0 +1,193 @@
+from fastapi import APIRouter, File, UploadFile, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from config import settings
+from routes import analyze
+from services import metrics
+from services.executor import InferenceQueueFull
+from services.jobs import JobStore, JobManager, JobError, JobQueueFull, FINAL_STATES, describe
+from utils.encoding import encode_json, encode_response, negotiate
+from utils.upload import read_upload, UploadTooLarge, UnsupportedUpload
+
+router = APIRouter()
+
+job_store: Optional[JobStore] = None
+job_manager: Optional[JobManager] = None
+
+SSE_KEEPALIVE_SECONDS = 15.0
+
+async def start_jobs():
+    global job_store, job_manager
+    if not settings.JOBS_ENABLED:
+        return
+
+    job_store = JobStore(settings.JOBS_DB_PATH)
+    job_manager = JobManager(
+        job_store,
+        run_job,
+        upload_dir=settings.JOBS_UPLOAD_DIR,
+        workers=settings.JOBS_WORKERS,
+        max_active=settings.JOBS_MAX_ACTIVE,
+        result_ttl=settings.JOBS_RESULT_TTL,
+        stale_after=settings.JOBS_STALE_SECONDS,
+        max_attempts=settings.JOBS_MAX_ATTEMPTS
+    )
+    metrics.JOBS_QUEUED.callback = lambda: job_manager.queued
+    await job_manager.start()
+
+async def stop_jobs():
+    global job_store, job_manager
+    if job_manager is not None:
+        await job_manager.stop()
+    if job_store is not None:
+        metrics.JOBS_QUEUED.callback = None
+        job_store.close()
+    job_store = job_manager = None
+
+async def run_job(content: bytes, filename: str, digest: Optional[str], output: str) -> Tuple[Dict, Optional[str]]:
+    """Analyzes a job's upload like /api/analyze would, waiting out model loads and a full inference queue."""
+    while True:
+        if analyze.model_state["status"] == "loading":
+            await asyncio.sleep(1.0)
+            continue
+        try:
+            predictions, cache_status, model_version = await analyze.run_analysis(content, filename, digest, output)
+        except InferenceQueueFull as e:
+            await asyncio.sleep(e.retry_after)
+            continue
+        except HTTPException as e:
+            raise JobError(e.detail)
+
+        return {
+            "success": True,
+            "predictions": predictions,
+            "image_name": filename,
+            "model_version": model_version,
+            "cache": cache_status
+        }, model_version
+
+def get_job_manager() -> JobManager:
+    if job_manager is None:
+        raise HTTPException(status_code=404, detail="Job API is disabled")
+    return job_manager
+
+def job_links(job_id: str) -> Dict:
+    return {
+        "status_url": f"/api/jobs/{job_id}",
+        "events_url": f"/api/jobs/{job_id}/events",
+        "result_url": f"/api/jobs/{job_id}/result"
+    }
+
+def include_result(request: Request) -> bool:
+    """``?result=false`` leaves the payload out, for clients that fetch it from result_url instead."""
+    return request.query_params.get("result", "true").lower() not in ("false", "0")
+
+@router.post("/jobs", status_code=202)
+async def create_job(request: Request, file: UploadFile = File(...)):
+    manager = get_job_manager()
+    output = analyze.resolve_output(request.query_params.get("output"))
+
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    try:
+        content, digest = await read_upload(file, settings.MAX_FILE_SIZE, settings.UPLOAD_CHUNK_SIZE)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        job = await manager.submit(content, file.filename, output, digest)
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many jobs waiting. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    return Response(
+        content=encode_json({**describe(job), **job_links(job["id"])}),
+        status_code=202,
+        media_type="application/json",
+        headers={"Location": f"/api/jobs/{job['id']}"}
+    )
+
+@router.get("/jobs/{job_id}")
+async def get_job(request: Request, job_id: str):
+    job = await get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return Response(content=encode_json({**describe(job, include_result(request)), **job_links(job_id)}),
+                    media_type="application/json")
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(request: Request, job_id: str):
+    """A succeeded job's result in the /api/analyze response format, negotiated by Accept like it."""
+    job = await get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job has no result (status: {job['status']})")
+    
+    body, media_type = encode_response(json.loads(job["result"]), negotiate(request.headers.get("accept")))
+    return Response(content=body, media_type=media_type,
+                    headers={"X-Model-Version": job["model_version"] or "", "Vary": "Accept"})
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(request: Request, job_id: str):
+    """Server-Sent Events: a "status" event with the job on every change, ending after the final state."""
+    manager = get_job_manager()
+    if await manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+    with_result = include_result(request)
+    
+    async def stream():
+        last_status = None
+        last_sent = time.monotonic()
+        while True:
+            job = await manager.get(job_id)
+            if job is None:
+                yield b"event: gone\ndata: {}\n\n"
+                return
+
+            if job["status"] != last_status:
+                last_status = job["status"]
+                last_sent = time.monotonic()
+                yield b"event: status\ndata: " + encode_json(describe(job, with_result)) + b"\n\n"
+                if last_status in FINAL_STATES:
+                    return
+            elif time.monotonic() - last_sent > SSE_KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield b": keepalive\n\n"
+
+            await manager.wait_for_change(timeout=1.0)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancels a queued or running job; deletes a finished one and its result."""
+    manager = get_job_manager()
+    previous = await manager.cancel(job_id)
+    if previous is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if previous in FINAL_STATES:
+        await manager.delete(job_id)
+        return {"job_id": job_id, "deleted": True}
+    return describe(await manager.get(job_id))
@@ -0,0 +1,111 @@
+import asyncio
+import functools
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+
+class MicroBatcher:
+    """Collects concurrent prediction requests into a single batched forward.
+
+    A batch is dispatched as soon as it holds ``max_batch_size`` items or the
+    oldest item has waited ``max_wait_ms``, whichever comes first. Each caller
+    receives its own slice of the batch output. Batches run on ``executor``
+    (anything with an async ``run(fn, *args)``) or the loop's default pool.
+
+    Up to ``max_concurrent_batches`` batches run at once, so a pool of worker
+    processes stays busy; while all are running, new requests queue up and
+    form the next, larger batch.
+    """
+
+    def __init__(self, predict_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 8, max_wait_ms: float = 10.0, executor=None,
+                 max_concurrent_batches: int = 1):
+        self.predict_batch = predict_batch
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatches: Set[asyncio.Task] = set()
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, image: Any) -> Any:
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            self._queue = None
+        for task in list(self._dispatches):
+            task.cancel()
+        self._dispatches.clear()
+
+    def cancel(self):
+        """Stops the dispatch task from any thread, once nothing is waiting on it."""
+        worker = self._worker
+        if worker is not None and not worker.done():
+            worker.get_loop().call_soon_threadsafe(worker.cancel)
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        slots = self._slots
+        while True:
+            await slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(functools.partial(self._dispatch_done, slots))
+
+    def _dispatch_done(self, slots: asyncio.Semaphore, task: asyncio.Task):
+        self._dispatches.discard(task)
+        slots.release()
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        batch = [(image, future) for image, future in batch if not future.done()]
+        if not batch:
+            return
+
+        images = [image for image, _ in batch]
+        try:
+            if self.executor is not None:
+                outputs = await self.executor.run(self.predict_batch, images)
+            else:
+                outputs = await asyncio.get_running_loop().run_in_executor(None, self.predict_batch, images)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), output in zip(batch, outputs):
+            if not future.done():
+                future.set_result(output)
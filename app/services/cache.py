@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def model_identity(model_path: str) -> str:
+    try:
+        stat = os.stat(model_path)
+        return f"{os.path.abspath(model_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        return os.path.abspath(model_path)
+
+
+def make_cache_key(digest: str, model_id: str, conf_threshold: float, iou_threshold: float, *extra: Any) -> str:
+    parts = [digest, model_id, f"{conf_threshold:.4f}", f"{iou_threshold:.4f}", *[str(e) for e in extra]]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+class _CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any):
+        self.set(key, value)
+
+    def _record(self, value: Optional[Any]) -> Optional[Any]:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+class ResultCache(_CacheStats):
+    """In-process LRU cache with a per-entry TTL."""
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600):
+        super().__init__()
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at and expires_at < time.monotonic():
+                    del self._entries[key]
+                    entry = None
+                else:
+                    self._entries.move_to_end(key)
+            return self._record(entry[1] if entry is not None else None)
+
+    def set(self, key: str, value: Any):
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else 0
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats["entries"] = len(self._entries)
+        return stats
+
+
+class RedisResultCache(_CacheStats):
+    """Redis-backed cache sharing results across workers and hosts.
+
+    Redis being slow or down never fails an analysis: lookups count as
+    misses and writes are skipped. ``aget``/``aset`` run the network calls
+    on a small pool of their own, off the event loop.
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str, ttl_seconds: float = 3600, prefix: str = "alphadent:result:",
+                 timeout: float = 1.0):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("redis package is not installed. Install with: pip install redis")
+
+        self.client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.errors = 0
+        self._redis_error = redis.RedisError
+        self._failing = False
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="redis-cache")
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await asyncio.get_running_loop().run_in_executor(self._pool, self.get, key)
+
+    async def aset(self, key: str, value: Any):
+        await asyncio.get_running_loop().run_in_executor(self._pool, self.set, key, value)
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = self.client.get(self.prefix + key)
+        except self._redis_error as e:
+            self._failed(e)
+            return self._record(None)
+        self._recovered()
+        return self._record(json.loads(raw) if raw is not None else None)
+
+    def set(self, key: str, value: Any):
+        payload = json.dumps(value)
+        try:
+            if self.ttl_seconds > 0:
+                # Milliseconds, so a sub-second TTL does not round down to an invalid 0
+                self.client.psetex(self.prefix + key, max(1, int(self.ttl_seconds * 1000)), payload)
+            else:
+                self.client.set(self.prefix + key, payload)
+        except self._redis_error as e:
+            self._failed(e)
+            return
+        self._recovered()
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats["errors"] = self.errors
+        return stats
+
+    def _failed(self, error: Exception):
+        self.errors += 1
+        if not self._failing:
+            self._failing = True
+            print(f"Warning: Redis result cache unavailable ({error}); serving without it")
+
+    def _recovered(self):
+        if self._failing:
+            self._failing = False
+            print("Redis result cache is available again")
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+def create_result_cache(backend: str, max_entries: int, ttl_seconds: float, redis_url: str = ""):
+    if backend == "redis":
+        return RedisResultCache(redis_url, ttl_seconds=ttl_seconds)
+    return ResultCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
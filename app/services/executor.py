@@ -0,0 +1,90 @@
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable
+
+
+class InferenceQueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """Runs blocking inference on a dedicated thread pool.
+
+    At most ``max_concurrency`` calls execute at once and at most
+    ``max_queue`` more may wait for a slot. Requests beyond that are
+    rejected by ``admit()`` with ``InferenceQueueFull`` so the event loop
+    never piles up work it cannot serve.
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 16):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.pool = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="inference"
+        )
+        self.pending = 0
+        self.queued = 0
+        self.active = 0
+        self._avg_latency = 1.0
+        self._lock = threading.Lock()
+
+    @property
+    def max_pending(self) -> int:
+        return self.max_concurrency + self.max_queue
+
+    def retry_after(self) -> int:
+        waves = max(1, self.pending) / self.max_concurrency
+        return max(1, math.ceil(self._avg_latency * waves))
+
+    @asynccontextmanager
+    async def admit(self):
+        if self.pending >= self.max_pending:
+            raise InferenceQueueFull(self.retry_after())
+        self.pending += 1
+        try:
+            yield
+        finally:
+            self.pending -= 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self.queued += 1
+        dequeued = []
+
+        def dequeue(*_):
+            # Called when the call starts and again when its future finishes; only the first counts,
+            # so a call cancelled before it started still leaves the queue
+            with self._lock:
+                if not dequeued:
+                    dequeued.append(True)
+                    self.queued -= 1
+
+        # Carry context variables (e.g. the request's profile timeline) onto the worker thread
+        context = contextvars.copy_context()
+        future = self.pool.submit(context.run, self._timed, dequeue, fn, *args, **kwargs)
+        future.add_done_callback(dequeue)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _timed(self, dequeue: Callable, fn: Callable, *args, **kwargs) -> Any:
+        dequeue()
+        with self._lock:
+            self.active += 1
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._avg_latency = 0.8 * self._avg_latency + 0.2 * elapsed
+            with self._lock:
+                self.active -= 1
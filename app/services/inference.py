@@ -1,23 +1,74 @@
-try:
-    from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-except ImportError:
-    YOLO_AVAILABLE = False
-
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 import os
+import sys
+
+# ultralytics pulls in torch, so it is only imported when the torch backend is used
+YOLO_AVAILABLE = importlib.util.find_spec("ultralytics") is not None
+ONNX_AVAILABLE = importlib.util.find_spec("onnxruntime") is not None
+
+ImageSource = Union[str, bytes, np.ndarray]
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from utils.polygon_utils import mask_to_scaled_polygon, mask_to_scaled_rle
+from services.tiling import tile_grid, to_absolute, to_normalized, merge_detections
+from services import metrics, profiling
+from services.tuning import load_tuning_profile
+
+def _to_numpy(value) -> np.ndarray:
+    if hasattr(value, "cpu"):
+        return value.cpu().numpy()
+    return np.asarray(value)
 
 class DentalPathologyModel:
-    def __init__(self, model_path: str):
-        if not YOLO_AVAILABLE:
-            raise ImportError("ultralytics package is not installed. Install with: pip install ultralytics")
-        
+    def __init__(self, model_path: str, backend: str = "torch", imgsz: Optional[int] = None,
+                 polygon_mode: str = "native", tile_workers: int = 4, num_threads: int = 0,
+                 inter_op_threads: int = 0, tuning_profile: Optional[str] = "auto"):
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model file not found: {model_path}")
         
-        self.model = YOLO(model_path)
+        self.backend = backend.lower()
+        # Explicit arguments win; the profile (written by autotune.py) fills in what was left at 0
+        self.tuning = load_tuning_profile(tuning_profile, model_path, self.backend)
+        num_threads = num_threads or self.tuning.get("intra_op_threads", 0)
+        inter_op_threads = inter_op_threads or self.tuning.get("inter_op_threads", 0)
+        self.imgsz = imgsz or self.tuning.get("imgsz") or None
+        self.tuned_batch_size = self.tuning.get("batch_size")
+        self.polygon_mode = polygon_mode.lower()
+        self.tile_workers = max(1, tile_workers)
+        self._tile_pool = None
+        
+        if self.backend == "onnx":
+            if not ONNX_AVAILABLE:
+                raise ImportError("onnxruntime package is not installed. Install with: pip install onnxruntime")
+            from services.onnx_backend import OnnxSegmentationModel
+            self.model = OnnxSegmentationModel(model_path, imgsz=self.imgsz or 640, intra_op_threads=num_threads,
+                                               inter_op_threads=inter_op_threads)
+        elif self.backend == "torch":
+            if not YOLO_AVAILABLE:
+                raise ImportError("ultralytics package is not installed. Install with: pip install ultralytics")
+            from ultralytics import YOLO
+            if num_threads > 0 or inter_op_threads > 0:
+                import torch
+                if num_threads > 0:
+                    torch.set_num_threads(num_threads)
+                if inter_op_threads > 0:
+                    try:
+                        torch.set_num_interop_threads(inter_op_threads)
+                    except RuntimeError as e:
+                        # Only settable before torch starts its inter-op pool
+                        print(f"Warning: could not set inter-op threads to {inter_op_threads}: {e}")
+            self.model = YOLO(model_path)
+        else:
+            raise ValueError(f"Unknown model backend: {backend} (expected 'torch' or 'onnx')")
+        
         self.class_names = {
             0: "Abrasion",
             1: "Filling",
@@ -30,24 +81,141 @@ class DentalPathologyModel:
             8: "Caries Class 6"
         }
     
-    def predict(self, image_path: str, conf_threshold: float = 0.25, iou_threshold: float = 0.45) -> List[Dict]:
+    def predict(self, image: ImageSource, conf_threshold: float = 0.25, iou_threshold: float = 0.45,
+                output: str = "polygon") -> List[Dict]:
         try:
-            results = self.model(
-                image_path,
-                conf=conf_threshold,
-                iou=iou_threshold,
-                task="segment"
-            )
+            results = self.forward([image], conf_threshold, iou_threshold)
             
             if not results or len(results) == 0:
                 return []
             
-            return self._format_results(results[0])
+            with metrics.stage("postprocess"):
+                return self._format_results(results[0], output)
         except Exception as e:
             print(f"Error during prediction: {e}")
             return []
+
+    def predict_batch(self, images: List[ImageSource], conf_threshold: float = 0.25, iou_threshold: float = 0.45,
+                      output: str = "polygon") -> List[List[Dict]]:
+        if not images:
+            return []
+
+        try:
+            results = self.forward(images, conf_threshold, iou_threshold)
+        except Exception as e:
+            print(f"Error during batch prediction: {e}")
+            return [[] for _ in images]
+
+        if not results or len(results) != len(images):
+            return [[] for _ in images]
+
+        with metrics.stage("postprocess"):
+            return [self._format_results(result, output) for result in results]
+
+    def predict_tiled(self, image: ImageSource, conf_threshold: float = 0.25, iou_threshold: float = 0.45,
+                      tile_size: int = 1280, overlap: float = 0.2, tile_batch: int = 4,
+                      include_full_frame: bool = True) -> List[Dict]:
+        """Full-resolution inference on overlapping tiles.
+        
+        Tiles are run ``tile_batch`` at a time and each batch is reduced to
+        polygons before the next forward, so peak memory is bounded by one
+        tile batch. Detections of the same instance from different tiles and
+        the full frame are merged into one (see ``merge_instances``).
+        """
+        try:
+            image = self._load_source(image)
+            if isinstance(image, str):
+                image = cv2.imread(image)
+                if image is None:
+                    raise ValueError("Could not read image")
+            
+            height, width = image.shape[:2]
+            tiles = tile_grid(height, width, tile_size, overlap)
+            pool = self._get_tile_pool()
+            detections = []
+            
+            def collect(chunk, crops):
+                results = self.forward(crops, conf_threshold, iou_threshold)
+                futures = [pool.submit(self._format_tile, result, tile, (height, width))
+                           for result, tile in zip(results, chunk)]
+                del results
+                # Drained before the next forward, so only one batch of raw results is alive at a time
+                for future in futures:
+                    detections.extend(future.result())
+            
+            for start in range(0, len(tiles), max(1, tile_batch)):
+                chunk = tiles[start:start + tile_batch]
+                collect(chunk, [image[y1:y2, x1:x2] for x1, y1, x2, y2 in chunk])
+            
+            if include_full_frame and len(tiles) > 1:
+                collect([(0, 0, width, height)], [image])
+            
+            merged = merge_detections(detections, iou_threshold, executor=pool)
+            
+            return [to_normalized(detection, height, width) for detection in merged]
+        except Exception as e:
+            print(f"Error during tiled prediction: {e}")
+            return []
+
+    def _format_tile(self, result, tile, image_size) -> List[Dict]:
+        return [to_absolute(prediction, tile, image_size) for prediction in self._format_results(result)]
+
+    def _get_tile_pool(self) -> ThreadPoolExecutor:
+        if self._tile_pool is None:
+            self._tile_pool = ThreadPoolExecutor(max_workers=self.tile_workers, thread_name_prefix="tiles")
+        return self._tile_pool
+
+    def forward(self, images: List[ImageSource], conf_threshold: float = 0.25, iou_threshold: float = 0.45,
+                imgsz: Optional[int] = None) -> list:
+        kwargs = {}
+        if imgsz or self.imgsz:
+            kwargs["imgsz"] = imgsz or self.imgsz
+        
+        sources = [self._load_source(image) for image in images]
+        with metrics.stage("forward"):
+            results = self.model(
+                sources,
+                conf=conf_threshold,
+                iou=iou_threshold,
+                task="segment",
+                batch=len(images),
+                verbose=False,
+                **kwargs
+            )
+        
+        # ultralytics reports its own per-image preprocess/inference/postprocess split in ms
+        if profiling.current() is not None and self.backend == "torch" and results:
+            speed = getattr(results[0], "speed", None) or {}
+            for key, name in (("preprocess", "letterbox"), ("inference", "model"), ("postprocess", "nms")):
+                if speed.get(key) is not None:
+                    profiling.record(name, speed[key] * len(results) / 1000.0)
+        return results
+
+    def warmup(self, image_sizes: Optional[List[int]] = None):
+        sizes = image_sizes or [self.imgsz or self.default_imgsz]
+        
+        for size in sizes:
+            dummy = np.zeros((size, size, 3), dtype=np.uint8)
+            self.forward([dummy], imgsz=size if self.backend == "torch" else None)
+
+    @property
+    def default_imgsz(self) -> int:
+        if self.backend == "onnx":
+            return max(self.model.input_shape)
+        
+        imgsz = self.model.overrides.get("imgsz", 640)
+        return max(imgsz) if isinstance(imgsz, (list, tuple)) else int(imgsz)
+
+    def _load_source(self, image: ImageSource):
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            decoded = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if decoded is None:
+                raise ValueError("Could not decode image bytes")
+            return decoded
+        return image
     
-    def _format_results(self, result) -> List[Dict]:
+    def _format_results(self, result, output: str = "polygon") -> List[Dict]:
+        """Predictions with a normalized ``polygon`` each, or with an RLE ``mask`` when ``output`` is "rle"."""
         predictions = []
         
         if result is None:
@@ -63,17 +231,38 @@ class DentalPathologyModel:
             
             for i in range(num_detections):
                 try:
-                    cls = int(boxes.cls[i].item())
-                    conf = float(boxes.conf[i].item())
-                    mask = masks.data[i].cpu().numpy()
+                    cls = int(boxes.cls[i])
+                    conf = float(boxes.conf[i])
+                    mask = _to_numpy(masks.data[i])
+                    box = _to_numpy(boxes.xyxy[i])
                     
-                    if len(mask.shape) == 2:
-                        mask_h, mask_w = mask.shape
-                        if mask_h != orig_h or mask_w != orig_w:
-                            mask = cv2.resize(mask, (orig_w, orig_h), interpolation=cv2.INTER_NEAREST)
+                    if output == "rle":
+                        with profiling.span("rle"):
+                            rle = mask_to_scaled_rle(mask, (orig_h, orig_w), box,
+                                                     original_resolution=self.polygon_mode != "native")
+                        if rle is not None:
+                            predictions.append({
+                                "class_id": cls,
+                                "class_name": self.class_names.get(cls, f"Class {cls}"),
+                                "confidence": round(conf, 6),
+                                "mask": rle,
+                                "bbox": self._extract_bbox(box, (orig_h, orig_w))
+                            })
+                        continue
                     
-                    polygon = self._mask_to_polygon(mask, (orig_h, orig_w))
-                    bbox = self._extract_bbox(boxes.xyxy[i].cpu().numpy(), (orig_h, orig_w))
+                    if self.polygon_mode == "native":
+                        with profiling.span("contours"):
+                            polygon = mask_to_scaled_polygon(mask, (orig_h, orig_w), box)
+                    else:
+                        if len(mask.shape) == 2:
+                            mask_h, mask_w = mask.shape
+                            if mask_h != orig_h or mask_w != orig_w:
+                                with profiling.span("mask_resize"):
+                                    mask = cv2.resize(mask, (orig_w, orig_h), interpolation=cv2.INTER_NEAREST)
+                        
+                        with profiling.span("contours"):
+                            polygon = self._mask_to_polygon(mask, (orig_h, orig_w))
+                    bbox = self._extract_bbox(box, (orig_h, orig_w))
                     
                     if polygon and len(polygon) >= 6:
                         predictions.append({
@@ -92,11 +281,21 @@ class DentalPathologyModel:
             
             for i in range(len(boxes)):
                 try:
-                    cls = int(boxes.cls[i].item())
-                    conf = float(boxes.conf[i].item())
-                    bbox = self._extract_bbox(boxes.xyxy[i].cpu().numpy(), (orig_h, orig_w))
+                    cls = int(boxes.cls[i])
+                    conf = float(boxes.conf[i])
+                    bbox = self._extract_bbox(_to_numpy(boxes.xyxy[i]), (orig_h, orig_w))
+                    
+                    if output == "rle":
+                        predictions.append({
+                            "class_id": cls,
+                            "class_name": self.class_names.get(cls, f"Class {cls}"),
+                            "confidence": round(conf, 6),
+                            "mask": {"size": [1, 1], "counts": [0, 1], "region": dict(bbox)},
+                            "bbox": bbox
+                        })
+                        continue
                     
-                    x1, y1, x2, y2 = boxes.xyxy[i].cpu().numpy()
+                    x1, y1, x2, y2 = _to_numpy(boxes.xyxy[i])
                     polygon = [
                         float(x1 / orig_w), float(y1 / orig_h),
                         float(x2 / orig_w), float(y1 / orig_h),
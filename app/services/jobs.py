@@ -0,0 +1,423 @@
+import asyncio
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services import metrics
+
+ACTIVE_STATES = ("queued", "running")
+FINAL_STATES = ("succeeded", "failed", "cancelled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT,
+    output TEXT NOT NULL,
+    upload_path TEXT,
+    digest TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL,
+    expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    model_version TEXT,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class JobError(Exception):
+    """A job that cannot succeed, e.g. an invalid image; it is not retried."""
+
+
+class JobQueueFull(Exception):
+    def __init__(self, retry_after: int = 5):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+class JobStore:
+    """Jobs persisted in SQLite, so queued work survives restarts.
+
+    Safe to share between threads and between server processes using the
+    same file: workers claim jobs with ``BEGIN IMMEDIATE``, so each job
+    runs in one place only.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def create(self, job_id: str, filename: str, output: str, upload_path: str, digest: Optional[str]) -> Dict:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, status, filename, output, upload_path, digest, created_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, filename, output, upload_path, digest, time.time())
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def status(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["status"] if row is not None else None
+
+    def count_active(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+
+    def count_queued(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def claim_next(self) -> Optional[Dict]:
+        """Moves the oldest queued job to running and returns it."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                        "WHERE id = ?",
+                        (now, now, row["id"])
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = dict(row)
+        job.update(status="running", started_at=now, heartbeat_at=now, attempts=job["attempts"] + 1)
+        return job
+
+    def heartbeat(self, job_ids: List[str]):
+        if not job_ids:
+            return
+        with self._lock:
+            self._db.executemany(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                [(time.time(), job_id) for job_id in job_ids]
+            )
+
+    def finish(self, job_id: str, status: str, ttl: float, result: Optional[Dict] = None,
+               error: Optional[str] = None, model_version: Optional[str] = None) -> bool:
+        """Records a running job's outcome; False if it was cancelled or removed meanwhile."""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, expires_at = ?, result = ?, error = ?, model_version = ? "
+                "WHERE id = ? AND status = 'running'",
+                (status, now, now + ttl, json.dumps(result) if result is not None else None, error, model_version, job_id)
+            )
+        return cursor.rowcount == 1
+
+    def cancel(self, job_id: str, ttl: float) -> Optional[str]:
+        """Cancels a queued or running job; returns its status before the call."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is not None and row["status"] in ACTIVE_STATES:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'cancelled', finished_at = ?, expires_at = ? WHERE id = ?",
+                        (now, now + ttl, job_id)
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return row["status"] if row is not None else None
+
+    def delete(self, job_id: str) -> Optional[Dict]:
+        job = self.get(job_id)
+        if job is not None:
+            with self._lock:
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return job
+
+    def requeue_stale(self, cutoff: float, max_attempts: int, ttl: float) -> int:
+        """Running jobs whose worker stopped heartbeating (e.g. a killed process) go back to the queue."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, expires_at = ?, error = 'Worker stopped responding' "
+                "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                (now, now + ttl, cutoff, max_attempts)
+            )
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'queued' WHERE status = 'running' AND heartbeat_at < ?",
+                (cutoff,)
+            )
+        return cursor.rowcount
+
+    def pop_expired(self) -> List[Dict]:
+        """Deletes finished jobs past their expiry and returns them."""
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, upload_path FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (now,)
+            ).fetchall()
+            self._db.executemany("DELETE FROM jobs WHERE id = ?", [(row["id"],) for row in rows])
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+Runner = Callable[[bytes, str, Optional[str], str], Awaitable[Tuple[Dict, Optional[str]]]]
+
+
+class JobManager:
+    """Runs stored jobs on ``workers`` background tasks.
+
+    ``runner(content, filename, digest, output)`` does the analysis and
+    returns (response payload, model version); raising ``JobError`` fails
+    the job, any other exception fails it with the message. Uploads are
+    kept in ``upload_dir`` until their job finishes.
+
+    Store calls run on a small thread pool: a write lock held by another
+    server process can block SQLite for seconds, and that must not stall
+    the event loop.
+    """
+
+    def __init__(self, store: JobStore, runner: Runner, upload_dir: str, workers: int = 2,
+                 max_active: int = 100, result_ttl: float = 3600.0, poll_interval: float = 1.0,
+                 stale_after: float = 60.0, max_attempts: int = 3):
+        self.store = store
+        self.runner = runner
+        self.upload_dir = upload_dir
+        self.workers = max(1, workers)
+        self.max_active = max_active
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._db_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="jobs-db")
+        self.queued = 0  # for metrics; kept up locally and recounted by maintenance
+
+    async def start(self):
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self._wakeup = asyncio.Event()
+        self._changed = asyncio.Event()
+        requeued = await self._db(self.store.requeue_stale, time.time() - self.stale_after, self.max_attempts, self.result_ttl)
+        if requeued:
+            print(f"Requeued {requeued} interrupted job(s)")
+        self.queued = await self._db(self.store.count_queued)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintenance()))
+
+    async def stop(self):
+        # Jobs still running stay 'running' and are requeued once their heartbeat goes stale
+        runs = list(self._running.values())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Let cancelled jobs finish their cleanup before the store is closed
+        await asyncio.gather(*runs, return_exceptions=True)
+        self._tasks = []
+        self._db_pool.shutdown(wait=True)
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        return await self._db(self.store.get, job_id)
+
+    async def submit(self, content: bytes, filename: str, output: str, digest: Optional[str] = None) -> Dict:
+        if await self._db(self.store.count_active) >= self.max_active:
+            raise JobQueueFull()
+
+        job_id = uuid.uuid4().hex
+        upload_path = os.path.join(self.upload_dir, f"{job_id}.upload")
+        await asyncio.get_running_loop().run_in_executor(None, _write_file, upload_path, content)
+        job = await self._db(self.store.create, job_id, filename, output, upload_path, digest)
+        self.queued += 1
+        self._notify(wakeup=True)
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[str]:
+        # Read before cancelling: the row may be deleted right after, taking the path with it
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        previous = await self._db(self.store.cancel, job_id, self.result_ttl)
+        if previous in ACTIVE_STATES:
+            metrics.JOBS.inc(status="cancelled")
+            task = self._running.get(job_id)
+            if task is not None:
+                task.cancel()
+            elif previous == "queued":
+                self.queued = max(0, self.queued - 1)
+                _remove_file(job["upload_path"])
+            self._notify()
+        return previous
+
+    async def delete(self, job_id: str) -> Optional[Dict]:
+        job = await self._db(self.store.delete, job_id)
+        if job is not None:
+            _remove_file(job["upload_path"])
+            self._notify()
+        return job
+
+    async def wait_for_change(self, timeout: float):
+        """Returns after any local job update, or after ``timeout`` to catch other processes' updates."""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _db(self, fn: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._db_pool, fn, *args)
+
+    def _notify(self, wakeup: bool = False):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+        if wakeup:
+            self._wakeup.set()
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._db(self.store.claim_next)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self.queued = max(0, self.queued - 1)
+            self._notify()
+            task = asyncio.create_task(self._run(job))
+            self._running[job["id"]] = task
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    # The worker itself is stopping; leave the job for a restart to pick up
+                    task.cancel()
+                    raise
+            finally:
+                self._running.pop(job["id"], None)
+            self._notify()
+
+    async def _run(self, job: Dict):
+        start = time.perf_counter()
+        status, finished = "failed", False
+        try:
+            content = await asyncio.get_running_loop().run_in_executor(None, _read_file, job["upload_path"])
+            payload, model_version = await self.runner(content, job["filename"], job["digest"], job["output"])
+            finished = await self._db(functools.partial(self.store.finish, job["id"], "succeeded", self.result_ttl,
+                                                        result=payload, model_version=model_version))
+            status = "succeeded"
+        except FileNotFoundError:
+            finished = await self._finish_failed(job["id"], "Upload is no longer available")
+        except JobError as e:
+            finished = await self._finish_failed(job["id"], str(e))
+        except Exception as e:
+            print(f"Job {job['id']} failed: {e}")
+            finished = await self._finish_failed(job["id"], f"Analysis failed: {str(e)}")
+        finally:
+            # Not finished: cancelled (already counted by cancel()), removed, or interrupted by shutdown
+            if finished:
+                metrics.JOBS.inc(status=status)
+            else:
+                status = "cancelled"
+            metrics.JOB_SECONDS.observe(time.perf_counter() - start, status=status)
+            # A job interrupted by shutdown is still 'running' and needs its upload after a restart
+            if await self._db(self.store.status, job["id"]) in FINAL_STATES + (None,):
+                _remove_file(job["upload_path"])
+
+    async def _finish_failed(self, job_id: str, error: str) -> bool:
+        return await self._db(functools.partial(self.store.finish, job_id, "failed", self.result_ttl, error=error))
+
+    async def _maintenance(self):
+        interval = max(self.poll_interval, min(self.stale_after / 3, 30.0))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                running = list(self._running)
+                await self._db(self.store.heartbeat, running)
+                # Cancellation requested through another server process
+                for job_id in running:
+                    if await self._db(self.store.status, job_id) == "cancelled" and job_id in self._running:
+                        self._running[job_id].cancel()
+
+                stale_before = time.time() - self.stale_after
+                if await self._db(self.store.requeue_stale, stale_before, self.max_attempts, self.result_ttl):
+                    self._notify(wakeup=True)
+                for job in await self._db(self.store.pop_expired):
+                    _remove_file(job["upload_path"])
+                self.queued = await self._db(self.store.count_queued)
+            except Exception as e:
+                print(f"Job maintenance failed: {e}")
+
+
+def describe(job: Dict, include_result: bool = True) -> Dict:
+    """Public view of a job row; the result payload is included once it succeeded, unless left out."""
+    view = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "image_name": job["filename"],
+        "output": job["output"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "expires_at": job["expires_at"],
+        "attempts": job["attempts"],
+        "model_version": job["model_version"]
+    }
+    if job["error"]:
+        view["error"] = job["error"]
+    if job["result"] is not None and include_result:
+        view["result"] = json.loads(job["result"])
+    return view
+
+
+def _write_file(path: str, content: bytes):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _remove_file(path: Optional[str]):
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,223 @@
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+
+from services import profiling
+
+try:
+    import onnxruntime as ort
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+
+class OnnxBoxes:
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class OnnxMasks:
+    def __init__(self, data: np.ndarray):
+        self.data = data
+
+
+class OnnxResult:
+    """Mirrors the subset of ``ultralytics.engine.results.Results`` that
+    ``DentalPathologyModel._format_results`` reads, backed by NumPy arrays.
+
+    ``masks.data`` covers the letterboxed image with its padding removed, so
+    it has the aspect ratio of the original photo.
+    """
+
+    def __init__(self, orig_shape: Tuple[int, int], boxes: OnnxBoxes, masks: Optional[OnnxMasks]):
+        self.orig_shape = orig_shape
+        self.boxes = boxes
+        self.masks = masks
+
+
+class OnnxSegmentationModel:
+    """YOLOv8-seg inference on ONNX Runtime (CPU), without torch.
+
+    Expects the graph produced by ``YOLO.export(format='onnx')``:
+    ``output0`` of shape (B, 4 + nc + nm, N) and ``output1`` prototypes of
+    shape (B, nm, H/4, W/4).
+    """
+
+    def __init__(self, model_path: str, imgsz: int = 640, max_det: int = 300,
+                 intra_op_threads: int = 0, inter_op_threads: int = 0):
+        if not ONNX_AVAILABLE:
+            raise ImportError("onnxruntime package is not installed. Install with: pip install onnxruntime")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads > 0:
+            options.inter_op_num_threads = inter_op_threads
+
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.max_det = max_det
+
+        batch_dim, _, height, width = self.session.get_inputs()[0].shape
+        self.static_batch = batch_dim if isinstance(batch_dim, int) else None
+        self.input_shape = (
+            height if isinstance(height, int) else imgsz,
+            width if isinstance(width, int) else imgsz
+        )
+
+    def __call__(self, source, conf: float = 0.25, iou: float = 0.45, **kwargs) -> List[OnnxResult]:
+        sources = source if isinstance(source, list) else [source]
+        images = [self._read(item) for item in sources]
+
+        if not images:
+            return []
+
+        with profiling.span("letterbox"):
+            tensors, geometries = zip(*(self.letterbox(image) for image in images))
+            batch = np.stack(tensors)
+        with profiling.span("model"):
+            outputs, protos = self._forward(batch)
+
+        return [
+            self._postprocess(outputs[i], protos[i], geometries[i], images[i].shape[:2], conf, iou)
+            for i in range(len(images))
+        ]
+
+    def letterbox(self, image: np.ndarray) -> Tuple[np.ndarray, Tuple[float, float, float, int, int]]:
+        h0, w0 = image.shape[:2]
+        height, width = self.input_shape
+        ratio = min(height / h0, width / w0)
+        new_w, new_h = int(round(w0 * ratio)), int(round(h0 * ratio))
+        pad_x, pad_y = (width - new_w) / 2, (height - new_h) / 2
+
+        if (new_w, new_h) != (w0, h0):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+        top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+        left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+        image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+        tensor = cv2.cvtColor(image, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)
+        tensor = np.ascontiguousarray(tensor, dtype=np.float32) / 255.0
+
+        return tensor, (ratio, left, top, new_w, new_h)
+
+    def _forward(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if self.static_batch is None or self.static_batch == len(batch):
+            outputs, protos = self.session.run(None, {self.input_name: batch})[:2]
+            return outputs, protos
+
+        chunks = [self.session.run(None, {self.input_name: batch[i:i + 1]})[:2] for i in range(len(batch))]
+        return np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks])
+
+    def _postprocess(self, output: np.ndarray, proto: np.ndarray, geometry, orig_shape: Tuple[int, int],
+                     conf_threshold: float, iou_threshold: float) -> OnnxResult:
+        num_masks = proto.shape[0]
+        num_classes = output.shape[0] - 4 - num_masks
+        predictions = output.T
+
+        scores = predictions[:, 4:4 + num_classes]
+        classes = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), classes]
+
+        keep = confidences > conf_threshold
+        predictions, classes, confidences = predictions[keep], classes[keep], confidences[keep]
+
+        with profiling.span("nms"):
+            boxes = self._xywh_to_xyxy(predictions[:, :4])
+            order = non_max_suppression(boxes, confidences, classes, iou_threshold)[:self.max_det]
+
+        boxes, classes, confidences = boxes[order], classes[order], confidences[order]
+        coefficients = predictions[order, 4 + num_classes:]
+
+        with profiling.span("mask_resize"):
+            masks = self._assemble_masks(proto, coefficients, boxes, geometry) if len(order) else None
+        ratio, left, top, _, _ = geometry
+        h0, w0 = orig_shape
+
+        boxes = (boxes - np.array([left, top, left, top], dtype=np.float32)) / ratio
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w0)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h0)
+
+        return OnnxResult(
+            (h0, w0),
+            OnnxBoxes(boxes.astype(np.float32), confidences.astype(np.float32), classes.astype(np.float32)),
+            OnnxMasks(masks) if masks is not None else None
+        )
+
+    def _assemble_masks(self, proto: np.ndarray, coefficients: np.ndarray, boxes: np.ndarray, geometry) -> np.ndarray:
+        num_masks, proto_h, proto_w = proto.shape
+        height, width = self.input_shape
+        ratio, left, top, new_w, new_h = geometry
+
+        logits = coefficients @ proto.reshape(num_masks, -1)
+        masks = (1.0 / (1.0 + np.exp(-logits))).reshape(-1, proto_h, proto_w)
+
+        scale_x, scale_y = proto_w / width, proto_h / height
+        cols = np.arange(proto_w, dtype=np.float32)[None, None, :]
+        rows = np.arange(proto_h, dtype=np.float32)[None, :, None]
+        x1, y1, x2, y2 = np.split(boxes * np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32), 4, axis=1)
+        inside = (cols >= x1[:, :, None]) & (cols < x2[:, :, None]) & (rows >= y1[:, :, None]) & (rows < y2[:, :, None])
+        masks = masks * inside
+
+        px1, py1 = int(left * scale_x), int(top * scale_y)
+        px2 = int(round((left + new_w) * scale_x))
+        py2 = int(round((top + new_h) * scale_y))
+        masks = masks[:, py1:py2, px1:px2]
+
+        upsampled = np.empty((len(masks), new_h, new_w), dtype=np.float32)
+        for i, mask in enumerate(masks):
+            upsampled[i] = cv2.resize(mask, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+        return (upsampled > 0.5).astype(np.float32)
+
+    def _read(self, source) -> np.ndarray:
+        if isinstance(source, np.ndarray):
+            return source
+        image = cv2.imread(str(source))
+        if image is None:
+            raise ValueError(f"Could not read image: {source}")
+        return image
+
+    @staticmethod
+    def _xywh_to_xyxy(xywh: np.ndarray) -> np.ndarray:
+        xyxy = np.empty_like(xywh)
+        xyxy[:, 0] = xywh[:, 0] - xywh[:, 2] / 2
+        xyxy[:, 1] = xywh[:, 1] - xywh[:, 3] / 2
+        xyxy[:, 2] = xywh[:, 0] + xywh[:, 2] / 2
+        xyxy[:, 3] = xywh[:, 1] + xywh[:, 3] / 2
+        return xyxy
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Class-aware greedy NMS. Returns kept indices sorted by score."""
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    offset = classes.astype(np.float32)[:, None] * (boxes.max() + 1)
+    shifted = boxes + offset
+    areas = (shifted[:, 2] - shifted[:, 0]) * (shifted[:, 3] - shifted[:, 1])
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        xx1 = np.maximum(shifted[i, 0], shifted[rest, 0])
+        yy1 = np.maximum(shifted[i, 1], shifted[rest, 1])
+        xx2 = np.minimum(shifted[i, 2], shifted[rest, 2])
+        yy2 = np.minimum(shifted[i, 3], shifted[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-7)
+
+        order = rest[iou <= iou_threshold]
+
+    return np.array(keep, dtype=np.int64)
@@ -0,0 +1,64 @@
+import gc
+import os
+from typing import Dict, List, Optional
+
+
+def _torch_network(model):
+    """The underlying torch.nn.Module of a torch-backend DentalPathologyModel, if any."""
+    if getattr(model, "backend", None) != "torch":
+        return None
+    yolo = getattr(model, "model", None)
+    return getattr(yolo, "model", None)
+
+
+def freeze_for_sharing(model) -> Dict[str, int]:
+    """Prepares a freshly loaded model to be shared copy-on-write by forked workers.
+
+    Weights are put into their final, read-only form in the parent: the
+    network is switched to eval mode, gradients are disabled, and Conv+BN
+    layers are fused up front. Without the fusing, each worker would build
+    its own fused copy on the first predict. Finally gc.freeze() moves
+    everything loaded so far out of the collector's reach, so later
+    collections in the workers do not write to those objects.
+
+    Returns a snapshot of the tensors' version counters for
+    ``modified_tensors``.
+    """
+    snapshot: Dict[str, int] = {}
+    network = _torch_network(model)
+
+    if network is not None:
+        import torch
+        # libgomp's pool does not survive fork(); keep the parent single-threaded
+        torch.set_num_threads(1)
+        if hasattr(model.model, "fuse"):
+            model.model.fuse()
+            network = _torch_network(model)
+        network.eval()
+        for parameter in network.parameters():
+            parameter.requires_grad_(False)
+        snapshot = {name: tensor._version for name, tensor in network.state_dict(keep_vars=True).items()}
+
+    gc.collect()
+    gc.freeze()
+    return snapshot
+
+
+def modified_tensors(model, snapshot: Dict[str, int]) -> List[str]:
+    """Names of weights written in place since ``freeze_for_sharing``; each one un-shared its pages."""
+    network = _torch_network(model)
+    if network is None or not snapshot:
+        return []
+
+    state = network.state_dict(keep_vars=True)
+    return [name for name, version in snapshot.items() if name in state and state[name]._version != version]
+
+
+def configure_worker(model, workers: int, threads: Optional[int] = None):
+    """Per-worker intra-op thread count, set after fork."""
+    network = _torch_network(model)
+    if network is None:
+        return
+
+    import torch
+    torch.set_num_threads(threads or max(1, (os.cpu_count() or 1) // max(1, workers)))
@@ -0,0 +1,160 @@
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+PROFILE_MODES = ("timing", "cprofile")
+
+_current: contextvars.ContextVar[Optional["Timeline"]] = contextvars.ContextVar("profiling_timeline", default=None)
+
+# Only one cProfile profiler may be active per process (Python 3.12+ refuses a second one)
+_cprofile_lock = threading.Lock()
+
+
+class Timeline:
+    """Spans recorded for a single profiled request, in first-seen order.
+
+    Spans with the same name are summed, so a stage that runs once per
+    detection (e.g. contour tracing) shows up as one total with a count.
+    """
+
+    def __init__(self, mode: str = "timing"):
+        self.mode = mode
+        self.profile_id = uuid.uuid4().hex if mode == "cprofile" else None
+        self.profiler: Optional[cProfile.Profile] = None
+        self._spans: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            span = self._spans.setdefault(name, [0.0, 0])
+            span[0] += seconds
+            span[1] += 1
+
+    def spans(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: {"ms": round(total * 1000, 3), "count": count} for name, (total, count) in self._spans.items()}
+
+    def server_timing(self) -> str:
+        entries = []
+        for name, span in self.spans().items():
+            entry = f"{name};dur={span['ms']}"
+            if span["count"] > 1:
+                entry += f';desc="x{span["count"]}"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+def current() -> Optional[Timeline]:
+    return _current.get()
+
+
+@contextmanager
+def activate(timeline: Timeline):
+    token = _current.set(timeline)
+    try:
+        yield timeline
+    finally:
+        _current.reset(token)
+
+
+def record(name: str, seconds: float):
+    timeline = _current.get()
+    if timeline is not None:
+        timeline.add(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    """Times a block into the active timeline; a no-op outside profiled requests."""
+    timeline = _current.get()
+    if timeline is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timeline.add(name, time.perf_counter() - start)
+
+
+def call(fn: Callable, *args, **kwargs):
+    """Runs ``fn``, under cProfile when the active timeline asked for a dump.
+
+    cProfile only sees the calling thread, so this wraps the work on the
+    inference thread rather than the request coroutine. Concurrent
+    cprofile requests take turns.
+    """
+    timeline = _current.get()
+    if timeline is None or timeline.mode != "cprofile":
+        return fn(*args, **kwargs)
+
+    with _cprofile_lock:
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(fn, *args, **kwargs)
+        finally:
+            timeline.profiler = profiler
+
+
+def resolve_mode(requested: Optional[str], token: Optional[str], enabled: bool, required_token: str) -> Optional[str]:
+    """Maps a ``?profile=`` / ``X-Profile`` value to a profile mode, or None if not allowed."""
+    if not requested or not enabled:
+        return None
+    if required_token and token != required_token:
+        return None
+
+    requested = requested.strip().lower()
+    if requested in ("1", "true", "yes"):
+        return "timing"
+    return requested if requested in PROFILE_MODES else None
+
+
+def save_profile(timeline: Timeline, directory: str, keep: int = 0) -> Optional[str]:
+    """Dumps the timeline's cProfile stats; with ``keep`` > 0 only the newest ``keep`` dumps are kept."""
+    if timeline.profiler is None or timeline.profile_id is None:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{timeline.profile_id}.prof")
+    timeline.profiler.dump_stats(path)
+    if keep > 0:
+        prune_profiles(directory, keep)
+    return path
+
+
+def prune_profiles(directory: str, keep: int):
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".prof") and re.fullmatch(r"[0-9a-f]{32}", entry.name[:-5]):
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                pass
+    entries.sort(reverse=True)
+    for _, path in entries[keep:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def profile_path(profile_id: str, directory: str) -> Optional[str]:
+    if not re.fullmatch(r"[0-9a-f]{32}", profile_id):
+        return None
+    path = os.path.join(directory, f"{profile_id}.prof")
+    return path if os.path.exists(path) else None
+
+
+def format_profile(path: str, sort: str = "cumulative", limit: int = 40) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(path, stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from services.cache import model_identity
+
+
+def version_id(model_path: str) -> str:
+    """Short, stable id for a weights file: its name plus a digest of path, size and mtime."""
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    return f"{stem}-{hashlib.sha256(model_identity(model_path).encode()).hexdigest()[:8]}"
+
+
+class ModelVersion:
+    def __init__(self, version: str, path: str, model: Any, load_seconds: Optional[float] = None):
+        self.version = version
+        self.path = path
+        # The name comes from the caller and may be reused for new weights; caches key on this instead
+        self.weights_id = version_id(path)
+        self.model = model
+        self.backend = getattr(model, "backend", None)
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.state = "loaded"
+        self.in_flight = 0
+        self.served = 0
+        self.batchers = {}  # one MicroBatcher per output format
+
+    def retire(self):
+        """Stops this version's batchers and worker processes and drops the model."""
+        self.state = "retired"
+        for batcher in self.batchers.values():
+            batcher.cancel()
+        self.batchers = {}
+        if hasattr(self.model, "close"):
+            self.model.close()
+        self.model = None
+
+    def describe(self) -> Dict:
+        return {
+            "version": self.version,
+            "path": self.path,
+            "state": self.state,
+            "backend": self.backend,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "in_flight": self.in_flight,
+            "served": self.served
+        }
+
+
+def write_desired_version(path: str, version: str, model_path: str):
+    """Records the version every server process should serve; replaced atomically."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": version, "path": model_path, "requested_at": time.time()}, f)
+    os.replace(tmp_path, path)
+
+
+def read_desired_version(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            desired = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not read desired model version from {path}: {e}")
+        return None
+    return desired if desired.get("version") and desired.get("path") else None
+
+
+class ModelRegistry:
+    """Tracks loaded model versions and which one serves new requests.
+
+    Requests ``acquire()`` the active version and ``release()`` it when
+    done, so a swap never changes the model under a running request. A
+    replaced version keeps serving what it already accepted ("draining")
+    and is retired once its last request is released.
+    """
+
+    def __init__(self, history: int = 10):
+        self.history = max(1, history)
+        self.active: Optional[ModelVersion] = None
+        self.loading: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._versions: "OrderedDict[str, ModelVersion]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Optional[ModelVersion]:
+        with self._lock:
+            version = self.active
+            if version is not None:
+                version.in_flight += 1
+            return version
+
+    def release(self, version: Optional[ModelVersion]):
+        if version is None:
+            return
+        with self._lock:
+            version.in_flight -= 1
+            version.served += 1
+            retire = version.state == "draining" and version.in_flight == 0
+        if retire:
+            self._retire(version)
+
+    def activate(self, version: ModelVersion) -> Optional[ModelVersion]:
+        """Makes ``version`` serve new requests; returns the version it replaced."""
+        with self._lock:
+            previous = self.active
+            self.active = version
+            version.state = "active"
+            self._versions[version.version] = version
+            self._versions.move_to_end(version.version)
+
+            retire = False
+            if previous is not None and previous is not version:
+                previous.state = "draining"
+                retire = previous.in_flight == 0
+
+            while len(self._versions) > self.history:
+                oldest = next(iter(self._versions.values()))
+                if oldest.state != "retired":
+                    break
+                self._versions.popitem(last=False)
+
+        if retire:
+            self._retire(previous)
+        return previous
+
+    def begin_loading(self, version: str) -> bool:
+        with self._lock:
+            if self.loading is not None:
+                return False
+            self.loading = version
+            return True
+
+    def end_loading(self):
+        with self._lock:
+            self.loading = None
+
+    def batched_queue_depth(self) -> int:
+        with self._lock:
+            batchers = [batcher for version in self._versions.values() for batcher in version.batchers.values()]
+        return sum(batcher.queued for batcher in batchers)
+
+    def versions(self) -> List[Dict]:
+        with self._lock:
+            return [version.describe() for version in reversed(self._versions.values())]
+
+    def _retire(self, version: ModelVersion):
+        # Stopping worker processes can block for seconds; keep it off the caller (often the event loop)
+        threading.Thread(target=version.retire, name=f"retire-{version.version}", daemon=True).start()
+
+    def close(self):
+        with self._lock:
+            versions = [version for version in self._versions.values() if version.state != "retired"]
+            self.active = None
+        for version in versions:
+            version.retire()
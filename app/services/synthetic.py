@@ -0,0 +1,141 @@
+import math
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from services import metrics
+from utils.polygon_utils import encode_rle
+
+CLASS_NAMES = {
+    0: "Abrasion",
+    1: "Filling",
+    2: "Crown",
+    3: "Caries Class 1",
+    4: "Caries Class 2",
+    5: "Caries Class 3",
+    6: "Caries Class 4",
+    7: "Caries Class 5",
+    8: "Caries Class 6"
+}
+
+
+class SyntheticModel:
+    """Stand-in for ``DentalPathologyModel`` with configurable latency and output size.
+
+    Each forward takes ``latency_ms`` (plus ``batch_latency_ms`` per extra
+    image in a batch), scaled by a log-normal factor with ``jitter`` sigma.
+    ``mode="sleep"`` releases the GIL like a native runtime would;
+    ``mode="burn"`` spins the CPU in Python to model GIL-bound work.
+    Outputs have the same shape as real predictions, with up to
+    ``max_detections`` polygons of ``polygon_points`` vertices.
+    """
+
+    backend = "synthetic"
+
+    def __init__(self, latency_ms: float = 80.0, jitter: float = 0.3, mode: str = "sleep",
+                 batch_latency_ms: float = 15.0, max_detections: int = 12, polygon_points: int = 80,
+                 imgsz: Optional[int] = None, seed: Optional[int] = None):
+        if mode not in ("sleep", "burn"):
+            raise ValueError(f"Unknown synthetic latency mode: {mode} (expected 'sleep' or 'burn')")
+
+        self.latency_ms = max(0.0, latency_ms)
+        self.jitter = max(0.0, jitter)
+        self.mode = mode
+        self.batch_latency_ms = max(0.0, batch_latency_ms)
+        self.max_detections = max(0, max_detections)
+        self.polygon_points = max(3, polygon_points)
+        self.imgsz = imgsz or None
+        self.polygon_mode = "native"
+        self.class_names = dict(CLASS_NAMES)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def default_imgsz(self) -> int:
+        return 640
+
+    def predict(self, image, conf_threshold: float = 0.25, iou_threshold: float = 0.45,
+                output: str = "polygon") -> List[Dict]:
+        return self.predict_batch([image], conf_threshold, iou_threshold, output)[0]
+
+    def predict_batch(self, images: List, conf_threshold: float = 0.25, iou_threshold: float = 0.45,
+                      output: str = "polygon") -> List[List[Dict]]:
+        if not images:
+            return []
+
+        with metrics.stage("forward"):
+            self._wait(self.latency_ms + self.batch_latency_ms * (len(images) - 1))
+        with metrics.stage("postprocess"):
+            return [self._predictions(conf_threshold, output) for _ in images]
+
+    def predict_tiled(self, image, conf_threshold: float = 0.25, iou_threshold: float = 0.45, **kwargs) -> List[Dict]:
+        return self.predict(image, conf_threshold, iou_threshold)
+
+    def warmup(self, image_sizes: Optional[List[int]] = None):
+        pass
+
+    def _sample_latency(self, base_ms: float) -> float:
+        with self._lock:
+            factor = self._random.lognormvariate(-0.5 * self.jitter ** 2, self.jitter) if self.jitter else 1.0
+        return base_ms * factor / 1000.0
+
+    def _wait(self, base_ms: float):
+        seconds = self._sample_latency(base_ms)
+        if self.mode == "sleep":
+            time.sleep(seconds)
+            return
+
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+
+    def _predictions(self, conf_threshold: float, output: str = "polygon") -> List[Dict]:
+        with self._lock:
+            rng = random.Random(self._random.random())
+
+        predictions = []
+        for _ in range(rng.randint(0, self.max_detections)):
+            class_id = rng.randrange(len(self.class_names))
+            cx, cy = rng.uniform(0.1, 0.9), rng.uniform(0.1, 0.9)
+            rx, ry = rng.uniform(0.01, 0.08), rng.uniform(0.01, 0.08)
+
+            angles = np.linspace(0.0, 2.0 * math.pi, self.polygon_points, endpoint=False)
+            radii = 1.0 + np.array([rng.uniform(-0.15, 0.15) for _ in angles])
+            xs = np.clip(cx + rx * radii * np.cos(angles), 0.0, 1.0)
+            ys = np.clip(cy + ry * radii * np.sin(angles), 0.0, 1.0)
+
+            bbox = {
+                "x": float(xs.min()),
+                "y": float(ys.min()),
+                "w": float(xs.max() - xs.min()),
+                "h": float(ys.max() - ys.min())
+            }
+            prediction = {
+                "class_id": class_id,
+                "class_name": self.class_names[class_id],
+                "confidence": round(rng.uniform(max(conf_threshold, 0.25), 0.98), 6),
+                "bbox": bbox
+            }
+            if output == "rle":
+                prediction["mask"] = self._rasterize(xs, ys, bbox)
+            else:
+                prediction["polygon"] = np.column_stack([xs, ys]).ravel().tolist()
+            predictions.append(prediction)
+
+        return sorted(predictions, key=lambda p: p["confidence"], reverse=True)
+
+    def _rasterize(self, xs: np.ndarray, ys: np.ndarray, bbox: Dict) -> Dict:
+        """RLE of the polygon over its bbox, at the resolution a real model's masks would have"""
+        scale = self.imgsz or self.default_imgsz
+        width, height = max(1, int(np.ceil(bbox["w"] * scale))), max(1, int(np.ceil(bbox["h"] * scale)))
+        points = np.column_stack([(xs - bbox["x"]) * scale, (ys - bbox["y"]) * scale])
+        mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.fillPoly(mask, [points.round().astype(np.int32)], 1)
+
+        rle = encode_rle(mask)
+        rle["region"] = {"x": bbox["x"], "y": bbox["y"], "w": width / scale, "h": height / scale}
+        return rle
@@ -0,0 +1,211 @@
+import cv2
+import numpy as np
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
+
+Tile = Tuple[int, int, int, int]
+
+
+def tile_grid(height: int, width: int, tile_size: int, overlap: float = 0.2) -> List[Tile]:
+    """Overlapping (x1, y1, x2, y2) windows covering the image; edge tiles are shifted inwards."""
+    tile_size = max(1, tile_size)
+    stride = max(1, int(tile_size * (1.0 - overlap)))
+
+    def starts(length: int) -> List[int]:
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, stride))
+        positions.append(length - tile_size)
+        return positions
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+# A box this close (px) to a tile edge inside the image is taken to be cut by the seam
+SEAM_MARGIN = 2.0
+
+
+def to_absolute(prediction: Dict, tile: Tile, image_size: Optional[Tuple[int, int]] = None) -> Dict:
+    """Maps a prediction normalized to ``tile`` into absolute image pixels.
+
+    With ``image_size`` (height, width), ``cut`` tells whether the instance
+    runs into a tile edge that is not also an image edge, i.e. is likely a
+    fragment of something the neighbouring tile sees the rest of.
+    """
+    x1, y1, x2, y2 = tile
+    tile_w, tile_h = x2 - x1, y2 - y1
+
+    points = np.asarray(prediction["polygon"], dtype=np.float32).reshape(-1, 2)
+    points = points * np.array([tile_w, tile_h], dtype=np.float32) + np.array([x1, y1], dtype=np.float32)
+
+    bbox = prediction["bbox"]
+    box = np.array([
+        x1 + bbox["x"] * tile_w,
+        y1 + bbox["y"] * tile_h,
+        x1 + (bbox["x"] + bbox["w"]) * tile_w,
+        y1 + (bbox["y"] + bbox["h"]) * tile_h
+    ], dtype=np.float32)
+
+    cut = False
+    if image_size is not None:
+        height, width = image_size
+        bx1, by1, bx2, by2 = box
+        cut = bool((x1 > 0 and bx1 - x1 < SEAM_MARGIN) or (y1 > 0 and by1 - y1 < SEAM_MARGIN)
+                   or (x2 < width and x2 - bx2 < SEAM_MARGIN) or (y2 < height and y2 - by2 < SEAM_MARGIN))
+
+    return {
+        "class_id": prediction["class_id"],
+        "class_name": prediction["class_name"],
+        "confidence": prediction["confidence"],
+        "points": points,
+        "box": box,
+        "cut": cut
+    }
+
+
+def to_normalized(detection: Dict, height: int, width: int) -> Dict:
+    points = detection["points"] / np.array([width, height], dtype=np.float32)
+    x1, y1, x2, y2 = detection["box"]
+
+    return {
+        "class_id": detection["class_id"],
+        "class_name": detection["class_name"],
+        "confidence": detection["confidence"],
+        "polygon": np.clip(points, 0.0, 1.0).astype(np.float64).ravel().tolist(),
+        "bbox": {
+            "x": float(x1 / width),
+            "y": float(y1 / height),
+            "w": float((x2 - x1) / width),
+            "h": float((y2 - y1) / height)
+        }
+    }
+
+
+def _mask_overlap(a: Dict, b: Dict, max_side: int = 256) -> Tuple[float, float]:
+    """Mask IoU and intersection-over-smaller of two polygons, rasterized over their joint box."""
+    ax1, ay1, ax2, ay2 = a["box"]
+    bx1, by1, bx2, by2 = b["box"]
+    if min(ax2, bx2) <= max(ax1, bx1) or min(ay2, by2) <= max(ay1, by1):
+        return 0.0, 0.0
+
+    x1, y1 = min(ax1, bx1), min(ay1, by1)
+    x2, y2 = max(ax2, bx2), max(ay2, by2)
+    scale = min(1.0, max_side / max(x2 - x1, y2 - y1, 1.0))
+    shape = (int(np.ceil((y2 - y1) * scale)) + 1, int(np.ceil((x2 - x1) * scale)) + 1)
+
+    def rasterize(detection):
+        canvas = np.zeros(shape, dtype=np.uint8)
+        points = ((detection["points"] - np.array([x1, y1])) * scale).round().astype(np.int32)
+        cv2.fillPoly(canvas, [points], 1)
+        return canvas.astype(bool)
+
+    mask_a, mask_b = rasterize(a), rasterize(b)
+    intersection = np.count_nonzero(mask_a & mask_b)
+    if intersection == 0:
+        return 0.0, 0.0
+
+    area_a, area_b = np.count_nonzero(mask_a), np.count_nonzero(mask_b)
+    union = area_a + area_b - intersection
+    return intersection / union, intersection / max(min(area_a, area_b), 1)
+
+
+def _box_area(detection: Dict) -> float:
+    x1, y1, x2, y2 = detection["box"]
+    return float((x2 - x1) * (y2 - y1))
+
+
+def _union(detections: List[Dict], max_side: int = 1024) -> Dict:
+    """One detection covering all of ``detections``: the outline of their rasterized union."""
+    boxes = np.array([d["box"] for d in detections], dtype=np.float32)
+    x1, y1 = boxes[:, 0].min(), boxes[:, 1].min()
+    x2, y2 = boxes[:, 2].max(), boxes[:, 3].max()
+    scale = min(1.0, max_side / max(x2 - x1, y2 - y1, 1.0))
+    canvas = np.zeros((int(np.ceil((y2 - y1) * scale)) + 1, int(np.ceil((x2 - x1) * scale)) + 1), dtype=np.uint8)
+    for detection in detections:
+        points = ((detection["points"] - np.array([x1, y1])) * scale).round().astype(np.int32)
+        cv2.fillPoly(canvas, [points], 1)
+    # Close the one-pixel gaps rounding can leave along a seam
+    canvas = cv2.morphologyEx(canvas, cv2.MORPH_CLOSE, np.ones((3, 3), dtype=np.uint8))
+
+    contours, _ = cv2.findContours(canvas, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    outline = max(contours, key=cv2.contourArea).reshape(-1, 2).astype(np.float32)
+    points = outline / scale + np.array([x1, y1], dtype=np.float32)
+
+    strongest = max(detections, key=lambda d: d["confidence"])
+    return {**strongest, "points": points, "box": np.array([x1, y1, x2, y2], dtype=np.float32), "cut": False}
+
+
+def merge_instances(detections: List[Dict], iou_threshold: float = 0.5,
+                    containment_threshold: float = 0.8) -> List[Dict]:
+    """Merges detections of a single class that describe the same instance.
+
+    Two detections belong together when their masks overlap by more than
+    ``iou_threshold`` IoU, when one is mostly contained in the other, or
+    when they overlap at all and one was cut by a tile seam. Each group
+    keeps its largest member if that covers the rest (e.g. the full-frame
+    detection over its seam fragments), otherwise the union of the masks,
+    with the group's best confidence either way.
+    """
+    count = len(detections)
+    parent = list(range(count))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    overlaps = {}
+    for i in range(count):
+        for j in range(i + 1, count):
+            iou, containment = _mask_overlap(detections[i], detections[j])
+            if containment <= 0.0:
+                continue
+            overlaps[i, j] = containment
+            seam = detections[i].get("cut") or detections[j].get("cut")
+            if iou > iou_threshold or containment > containment_threshold or seam:
+                parent[find(i)] = find(j)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(count):
+        groups.setdefault(find(i), []).append(i)
+
+    merged = []
+    for members in groups.values():
+        if len(members) == 1:
+            merged.append(detections[members[0]])
+            continue
+
+        largest = max(members, key=lambda i: _box_area(detections[i]))
+        confidence = max(detections[i]["confidence"] for i in members)
+        covers = all(
+            overlaps.get((min(i, largest), max(i, largest)), 0.0) > containment_threshold
+            and _box_area(detections[i]) <= _box_area(detections[largest])
+            for i in members if i != largest
+        )
+        if covers:
+            merged.append({**detections[largest], "confidence": confidence})
+        else:
+            merged.append(_union([detections[i] for i in members]))
+    return merged
+
+
+def merge_detections(detections: List[Dict], iou_threshold: float = 0.5,
+                     executor: Optional[Executor] = None) -> List[Dict]:
+    """Runs ``merge_instances`` per class, in parallel when an executor is given."""
+    by_class: Dict[int, List[Dict]] = {}
+    for detection in detections:
+        by_class.setdefault(detection["class_id"], []).append(detection)
+
+    groups = list(by_class.values())
+    if executor is not None:
+        merged = executor.map(lambda group: merge_instances(group, iou_threshold), groups)
+    else:
+        merged = (merge_instances(group, iou_threshold) for group in groups)
+
+    results = [detection for group in merged for detection in group]
+    return sorted(results, key=lambda d: d["confidence"], reverse=True)
@@ -0,0 +1,86 @@
+import json
+import os
+import platform
+import time
+from typing import Dict, Optional
+
+# Keys a tuning profile may set on DentalPathologyModel
+TUNED_KEYS = ("intra_op_threads", "inter_op_threads", "imgsz", "batch_size")
+
+
+def profile_path_for(model_path: str) -> str:
+    """Default profile location: next to the weights, e.g. models/best.onnx -> models/best.tuning.json"""
+    return os.path.splitext(model_path)[0] + ".tuning.json"
+
+
+def host_fingerprint() -> Dict:
+    """What the tuned numbers depend on; a profile from a different host is ignored."""
+    cpu = platform.processor() or ""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    return {"machine": platform.machine(), "cpu": cpu, "cores": cores or 1}
+
+
+def model_fingerprint(model_path: str, backend: str) -> Dict:
+    return {"name": os.path.basename(model_path), "size": os.path.getsize(model_path), "backend": backend}
+
+
+def save_tuning_profile(path: str, model_path: str, backend: str, objective: str, concurrency: int,
+                        best: Dict, candidates: list):
+    profile = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": host_fingerprint(),
+        "model": model_fingerprint(model_path, backend),
+        "objective": objective,
+        "concurrency": concurrency,
+        "settings": {key: best[key] for key in TUNED_KEYS if best.get(key)},
+        "result": {key: best[key] for key in ("throughput", "p50_ms", "p95_ms") if key in best},
+        "candidates": candidates
+    }
+    with open(path, "w") as f:
+        json.dump(profile, f, indent=2)
+    return profile
+
+
+def load_tuning_profile(path: Optional[str], model_path: str, backend: str) -> Dict:
+    """Tuned settings for this model on this host, or {} when there is no usable profile.
+
+    ``path`` is a profile file, "auto" for the default location next to the
+    weights, or empty to disable tuning profiles.
+    """
+    if not path:
+        return {}
+    explicit = path != "auto"
+    if not explicit:
+        path = profile_path_for(model_path)
+    if not os.path.exists(path):
+        if explicit:
+            print(f"Warning: tuning profile not found: {path}")
+        return {}
+
+    try:
+        with open(path) as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not read tuning profile {path}: {e}")
+        return {}
+
+    host, model = host_fingerprint(), model_fingerprint(model_path, backend)
+    if profile.get("host") != host:
+        print(f"Warning: ignoring tuning profile {path}: tuned on {profile.get('host')}, running on {host}")
+        return {}
+    if profile.get("model") != model:
+        print(f"Warning: ignoring tuning profile {path}: tuned for {profile.get('model')}, loading {model}")
+        return {}
+
+    settings = {key: int(value) for key, value in (profile.get("settings") or {}).items() if key in TUNED_KEYS and value}
+    print(f"Loaded tuning profile {path} ({profile.get('objective')}): {settings}")
+    return settings
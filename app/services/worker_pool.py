@@ -0,0 +1,318 @@
+import multiprocessing as mp
+import os
+import queue
+import threading
+import traceback
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from services.tuning import load_tuning_profile
+
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_core_groups(workers: int, threads_per_worker: int = 0, cores: Optional[Sequence[int]] = None) -> List[List[int]]:
+    """Splits the usable cores into one contiguous group per worker.
+
+    With ``threads_per_worker`` 0 the cores are shared out evenly. Groups
+    wrap around when more threads are requested than there are cores.
+    """
+    cores = list(cores) if cores is not None else available_cores()
+    workers = max(1, workers)
+    per_worker = threads_per_worker or max(1, len(cores) // workers)
+    return [[cores[(i * per_worker + j) % len(cores)] for j in range(per_worker)] for i in range(workers)]
+
+
+def _worker_main(conn, model_kwargs: Dict, cores: List[int], pin_cores: bool, warmup_sizes: Optional[List[int]]):
+    # Thread pools are sized when torch/onnxruntime/BLAS load, so this runs before any of them are imported
+    threads = len(cores)
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    if pin_cores and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cores)
+        except OSError as e:
+            print(f"Warning: could not pin inference worker {os.getpid()} to cores {cores}: {e}")
+
+    attached: Dict[str, shared_memory.SharedMemory] = {}
+    try:
+        from services.inference import DentalPathologyModel
+        model = DentalPathologyModel(num_threads=threads, **model_kwargs)
+        model.warmup(warmup_sizes)
+        conn.send(("ready", {"default_imgsz": model.default_imgsz, "pid": os.getpid(), "cores": cores}))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message[0] == "stop":
+            break
+
+        method, segment_name, items, kwargs = message
+        images = []
+        try:
+            if segment_name is not None and segment_name not in attached:
+                for old in attached.values():
+                    old.close()
+                attached = {segment_name: shared_memory.SharedMemory(name=segment_name)}
+
+            for item in items:
+                if item[0] == "path":
+                    images.append(item[1])
+                else:
+                    _, offset, shape, dtype = item
+                    images.append(np.ndarray(shape, dtype=dtype, buffer=attached[segment_name].buf, offset=offset))
+
+            if method == "predict_tiled":
+                result = model.predict_tiled(images[0], **kwargs)
+            else:
+                result = model.predict_batch(images, **kwargs)
+            conn.send(("ok", result))
+        except Exception as e:
+            traceback.print_exc()
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+        finally:
+            del images
+
+    for segment in attached.values():
+        segment.close()
+
+
+class _Worker:
+    def __init__(self, index: int, cores: List[int]):
+        self.index = index
+        self.cores = cores
+        self.process = None
+        self.conn = None
+        self.segment: Optional[shared_memory.SharedMemory] = None
+        self.info: Dict = {}
+
+    def ensure_segment(self, size: int):
+        if self.segment is not None and self.segment.size >= size:
+            return
+        self.release_segment()
+        self.segment = shared_memory.SharedMemory(create=True, size=size)
+
+    def release_segment(self):
+        if self.segment is not None:
+            self.segment.close()
+            self.segment.unlink()
+            self.segment = None
+
+
+class ProcessInferencePool:
+    """Runs ``DentalPathologyModel`` in dedicated worker processes.
+
+    Each worker is pinned to its own group of cores with matching
+    intra-op threads, so workers do not contend for the same cores. Decoded
+    images are written into a per-worker shared memory segment and only a
+    small descriptor goes over the pipe; predictions come back pickled.
+
+    Exposes the same predict/predict_batch/predict_tiled interface as the
+    model, blocking the calling thread until a worker is free.
+    """
+
+    def __init__(self, model_path: str, workers: int, backend: str = "torch", imgsz: Optional[int] = None,
+                 polygon_mode: str = "native", tile_workers: int = 4, threads_per_worker: int = 0,
+                 pin_cores: bool = True, slot_mb: int = 64, warmup_sizes: Optional[List[int]] = None,
+                 start_timeout: float = 300.0, tuning_profile: Optional[str] = "auto", call_timeout: float = 120.0):
+        # Resolved here, before workers pin themselves: a pinned worker sees fewer cores
+        # than the autotuner did and would reject the profile as tuned for another host
+        self.tuning = load_tuning_profile(tuning_profile, model_path, backend)
+        self.model_kwargs = {
+            "model_path": model_path,
+            "backend": backend,
+            "imgsz": imgsz or self.tuning.get("imgsz"),
+            "polygon_mode": polygon_mode,
+            "tile_workers": tile_workers,
+            "inter_op_threads": self.tuning.get("inter_op_threads", 0),
+            "tuning_profile": None
+        }
+        self.backend = backend
+        self.imgsz = imgsz or None
+        self.polygon_mode = polygon_mode
+        self.pin_cores = pin_cores
+        self.warmup_sizes = warmup_sizes
+        self.slot_bytes = max(1, slot_mb) * 1024 * 1024
+        self.start_timeout = start_timeout
+        self.call_timeout = call_timeout
+        self._context = mp.get_context("spawn")
+        self._workers = [_Worker(i, cores) for i, cores in enumerate(plan_core_groups(workers, threads_per_worker))]
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._closed = False
+        self._restart_lock = threading.Lock()
+
+        try:
+            for worker in self._workers:
+                self._spawn(worker)
+            for worker in self._workers:
+                self._await_ready(worker)
+                self._idle.put(worker)
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def workers(self) -> int:
+        return len(self._workers)
+
+    @property
+    def default_imgsz(self) -> int:
+        return self._workers[0].info["default_imgsz"]
+
+    @property
+    def tuned_batch_size(self) -> Optional[int]:
+        return self.tuning.get("batch_size")
+
+    def predict(self, image, conf_threshold: float = 0.25, iou_threshold: float = 0.45,
+                output: str = "polygon") -> List[Dict]:
+        return self.predict_batch([image], conf_threshold, iou_threshold, output)[0]
+
+    def predict_batch(self, images: List, conf_threshold: float = 0.25, iou_threshold: float = 0.45,
+                      output: str = "polygon") -> List[List[Dict]]:
+        if not images:
+            return []
+        return self._call("predict_batch", images,
+                          {"conf_threshold": conf_threshold, "iou_threshold": iou_threshold, "output": output})
+
+    def predict_tiled(self, image, **kwargs) -> List[Dict]:
+        return self._call("predict_tiled", [image], kwargs)
+
+    def warmup(self, image_sizes: Optional[List[int]] = None):
+        # Workers warm up before reporting ready
+        pass
+
+    def close(self):
+        self._closed = True
+        for worker in self._workers:
+            self._stop(worker)
+
+    def _call(self, method: str, images: List, kwargs: Dict):
+        if self._closed:
+            raise RuntimeError("Inference pool is closed")
+
+        worker = self._take()
+        try:
+            items = []
+            arrays = [image for image in images if isinstance(image, np.ndarray)]
+            if arrays:
+                worker.ensure_segment(max(self.slot_bytes, sum(a.nbytes for a in arrays)))
+
+            offset = 0
+            for image in images:
+                if isinstance(image, np.ndarray):
+                    view = np.ndarray(image.shape, dtype=image.dtype, buffer=worker.segment.buf, offset=offset)
+                    view[...] = image
+                    del view
+                    items.append(("array", offset, image.shape, image.dtype.str))
+                    offset += image.nbytes
+                elif isinstance(image, str):
+                    items.append(("path", image))
+                else:
+                    raise TypeError(f"Unsupported image source for inference pool: {type(image).__name__}")
+
+            try:
+                worker.conn.send((method, worker.segment.name if arrays else None, items, kwargs))
+                answered = worker.conn.poll(self.call_timeout)
+                if answered:
+                    status, payload = worker.conn.recv()
+            except (EOFError, OSError, BrokenPipeError):
+                outcome = "restarted" if self._restart(worker) else "restart failed"
+                raise RuntimeError(f"Inference worker {worker.index} died; {outcome}")
+            if not answered:
+                outcome = "restarted" if self._restart(worker) else "restart failed"
+                raise TimeoutError(f"Inference worker {worker.index} did not answer within "
+                                   f"{self.call_timeout}s; {outcome}")
+
+            if status != "ok":
+                raise RuntimeError(f"Inference worker {worker.index} failed: {payload}")
+            return payload
+        finally:
+            if worker.process is not None and worker.process.is_alive():
+                self._idle.put(worker)
+            else:
+                self._drop(worker)
+
+    def _take(self) -> _Worker:
+        """Waits for an idle worker; fails instead of waiting forever once none are left."""
+        while True:
+            if self._closed:
+                raise RuntimeError("Inference pool is closed")
+            if not self._workers:
+                raise RuntimeError("No inference workers left; every restart failed")
+            try:
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+    def _drop(self, worker: _Worker):
+        with self._restart_lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+                print(f"Warning: inference worker {worker.index} removed from the pool; "
+                      f"{len(self._workers)} worker(s) left")
+
+    def _spawn(self, worker: _Worker):
+        parent_conn, child_conn = self._context.Pipe()
+        worker.conn = parent_conn
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.model_kwargs, worker.cores, self.pin_cores, self.warmup_sizes),
+            name=f"inference-worker-{worker.index}",
+            daemon=True
+        )
+        worker.process.start()
+        child_conn.close()
+
+    def _await_ready(self, worker: _Worker):
+        if not worker.conn.poll(self.start_timeout):
+            raise TimeoutError(f"Inference worker {worker.index} did not start within {self.start_timeout}s")
+        status, payload = worker.conn.recv()
+        if status != "ready":
+            raise RuntimeError(f"Inference worker {worker.index} failed to load the model: {payload}")
+        worker.info = payload
+        print(f"Inference worker {worker.index} ready (pid {payload['pid']}, cores {payload['cores']})")
+
+    def _restart(self, worker: _Worker) -> bool:
+        """Replaces a dead or hung worker; on failure it stays stopped and the caller drops it."""
+        with self._restart_lock:
+            self._stop(worker)
+            if self._closed:
+                return False
+            try:
+                self._spawn(worker)
+                self._await_ready(worker)
+                return True
+            except Exception as e:
+                print(f"Error restarting inference worker {worker.index}: {e}")
+                self._stop(worker)
+                return False
+
+    def _stop(self, worker: _Worker):
+        if worker.process is not None and worker.process.is_alive():
+            try:
+                worker.conn.send(("stop",))
+            except (OSError, BrokenPipeError):
+                pass
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join(timeout=5)
+        if worker.conn is not None:
+            worker.conn.close()
+        worker.release_segment()
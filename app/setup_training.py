@@ -6,9 +6,16 @@ Run this before starting training to ensure everything is ready.
 """
 
 import os
+import sys
 from pathlib import Path
 import yaml
 
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from utils.image_processing import probe_image_file, is_valid_probe
+
 def check_dataset_structure(dataset_path):
     """Check if dataset is organized correctly"""
     print("\n" + "="*70)
@@ -38,10 +45,15 @@ def check_dataset_structure(dataset_path):
             # Count files
             if 'images' in dir_path:
                 files = list(full_path.glob('*.jpg')) + list(full_path.glob('*.png'))
+                invalid = [f for f in files if not is_valid_probe(probe_image_file(str(f)))]
             else:
                 files = list(full_path.glob('*.txt'))
+                invalid = []
             
             print(f"✅ {description:20} {dir_path:20} ({len(files)} files)")
+            if invalid:
+                print(f"⚠️  {len(invalid)} unreadable or truncated images in {dir_path}, e.g. {invalid[0].name}")
+                all_good = False
         else:
             print(f"❌ {description:20} {dir_path:20} (NOT FOUND)")
             all_good = False
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pytest
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from utils.encoding import QUANT_SCALE, decode_packed, encode_packed
+
+
+def roundtrip(payload):
+    return decode_packed(encode_packed(payload))
+
+
+CLASS_IDS = {"Filling": 1, "Crown": 2, "Caries Class 1": 3}
+
+
+def prediction(class_name, polygon=None, mask=None):
+    """Same shape as DentalPathologyModel's predictions: a polygon, or an RLE mask in RLE mode"""
+    result = {"class_id": CLASS_IDS[class_name], "class_name": class_name, "confidence": 0.9}
+    if polygon is not None:
+        result["polygon"] = polygon
+    if mask is not None:
+        result["mask"] = mask
+    result["bbox"] = {"x": 0.1, "y": 0.1, "w": 0.2, "h": 0.2}
+    return result
+
+
+def test_no_predictions():
+    payload = {"success": True, "predictions": [], "image_name": "clean.jpg"}
+    assert roundtrip(payload) == payload
+
+
+def test_polygons_roundtrip_within_quantization():
+    polygons = [[0.1, 0.2, 0.5, 0.2, 0.5, 0.9], [0.9, 0.9, 0.0, 1.0, 0.3, 0.0, 0.7, 0.4]]
+    decoded = roundtrip({"predictions": [prediction("Caries Class 1", p) for p in polygons]})
+
+    for original, result in zip(polygons, decoded["predictions"]):
+        assert result["polygon"] == pytest.approx(original, abs=0.5 / QUANT_SCALE)
+        assert "points" not in result
+
+
+def test_empty_polygons_between_others():
+    polygons = [[], [0.1, 0.2, 0.3, 0.4], [], [0.5, 0.6, 0.7, 0.8, 0.2, 0.1]]
+    decoded = roundtrip({"predictions": [prediction("Crown", p) for p in polygons]})
+
+    assert [len(p["polygon"]) for p in decoded["predictions"]] == [0, 4, 0, 6]
+    assert decoded["predictions"][3]["polygon"] == pytest.approx(polygons[3], abs=0.5 / QUANT_SCALE)
+
+
+def test_rle_only_predictions():
+    mask = {"size": [4, 4], "counts": [3, 5, 8], "region": {"x": 0.1, "y": 0.1, "w": 0.2, "h": 0.2}}
+    payload = {"predictions": [prediction("Filling", mask=mask), prediction("Filling", mask=mask)]}
+    assert roundtrip(payload) == payload
+
+
+def test_mixed_polygon_and_rle():
+    mask = {"size": [2, 2], "counts": [1, 3], "region": {"x": 0.0, "y": 0.0, "w": 1.0, "h": 1.0}}
+    decoded = roundtrip({"predictions": [prediction("Filling", mask=mask), prediction("Caries Class 1", [0.25, 0.75, 0.5, 0.5])]})
+
+    assert "polygon" not in decoded["predictions"][0]
+    assert decoded["predictions"][0]["mask"] == mask
+    assert decoded["predictions"][1]["polygon"] == pytest.approx([0.25, 0.75, 0.5, 0.5], abs=0.5 / QUANT_SCALE)
+
+
+def test_rejects_other_payloads():
+    with pytest.raises(ValueError):
+        decode_packed(b'{"predictions": []}')
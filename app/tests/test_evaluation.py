@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from utils.evaluation import average_precision
+
+
+def test_single_hit_out_of_two():
+    # Recall 0.5 at precision 1: thresholds 0.00-0.50 (51 of 101) score 1, the rest 0
+    assert average_precision([0.5], [1.0]) == pytest.approx(51 / 101)
+
+
+def test_low_recall_is_not_extrapolated():
+    assert average_precision([0.1, 0.2], [1.0, 1.0]) == pytest.approx(21 / 101)
+
+
+def test_precision_is_the_running_max_to_the_right():
+    # Precision 0.5 at recall 0.5 is lifted to 2/3 by the later point at recall 1.0
+    assert average_precision([0.5, 0.5, 1.0], [1.0, 0.5, 2 / 3]) == pytest.approx((51 + 50 * 2 / 3) / 101)
+
+
+def test_perfect_and_empty():
+    assert average_precision([0.5, 1.0], [1.0, 1.0]) == pytest.approx(1.0)
+    assert average_precision([], []) == 0.0
@@ -0,0 +1,61 @@
+import os
+import sys
+
+import numpy as np
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from services.tiling import merge_detections, tile_grid, to_absolute
+
+
+def rectangle(x1, y1, x2, y2, confidence, cut=False, class_id=0):
+    points = np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float32)
+    return {"class_id": class_id, "class_name": "Caries", "confidence": confidence, "points": points,
+            "box": np.array([x1, y1, x2, y2], dtype=np.float32), "cut": cut}
+
+
+def test_full_frame_instance_wins_over_stronger_fragment():
+    full = rectangle(100, 100, 900, 300, confidence=0.6)
+    fragment = rectangle(100, 100, 500, 300, confidence=0.9, cut=True)
+
+    merged = merge_detections([full, fragment])
+
+    assert len(merged) == 1
+    assert merged[0]["box"].tolist() == full["box"].tolist()
+    assert merged[0]["confidence"] == 0.9
+
+
+def test_fragments_from_neighbouring_tiles_are_unioned():
+    # An instance wider than the tile overlap: each tile sees one end of it
+    left = rectangle(100, 100, 520, 300, confidence=0.8, cut=True)
+    right = rectangle(480, 100, 900, 300, confidence=0.7, cut=True)
+
+    merged = merge_detections([left, right])
+
+    assert len(merged) == 1
+    x1, y1, x2, y2 = merged[0]["box"]
+    assert (x1, y1, x2, y2) == (100, 100, 900, 300)
+    xs = merged[0]["points"][:, 0]
+    assert xs.min() <= 101 and xs.max() >= 899
+
+
+def test_separate_instances_are_kept():
+    a = rectangle(100, 100, 300, 300, confidence=0.8)
+    b = rectangle(290, 100, 500, 300, confidence=0.7)
+    other_class = rectangle(100, 100, 300, 300, confidence=0.9, class_id=1)
+
+    assert len(merge_detections([a, b, other_class])) == 3
+
+
+def test_to_absolute_flags_seam_cuts_only():
+    prediction = {"class_id": 0, "class_name": "Caries", "confidence": 0.5, "polygon": [0.5, 0.5, 1.0, 0.5, 1.0, 1.0],
+                  "bbox": {"x": 0.5, "y": 0.5, "w": 0.5, "h": 0.5}}
+    tiles = tile_grid(1000, 1800, tile_size=1000, overlap=0.2)
+
+    inner = to_absolute(prediction, tiles[0], (1000, 1800))
+    at_image_edge = to_absolute(prediction, tiles[-1], (1000, 1800))
+
+    assert inner["cut"] is True
+    assert at_image_edge["cut"] is False
@@ -0,0 +1,110 @@
+import json
+import struct
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+JSON_MEDIA_TYPE = "application/json"
+PACKED_MEDIA_TYPE = "application/vnd.alphadent.packed"
+
+PACKED_MAGIC = b"ADP1"
+# Normalized coordinates are stored as round(v * QUANT_SCALE): ~1.5e-5 steps, under 0.1 px on a 5000 px photo
+QUANT_SCALE = 65535
+
+def negotiate(accept: Optional[str]) -> str:
+    """Picks the response media type from an Accept header; JSON unless packed is preferred."""
+    best, best_q = JSON_MEDIA_TYPE, 0.0
+    for part in (accept or "").split(","):
+        fields = [f.strip() for f in part.split(";")]
+        media_type = fields[0].lower()
+        q = 1.0
+        for field in fields[1:]:
+            if field.startswith("q="):
+                try:
+                    q = float(field[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type == PACKED_MEDIA_TYPE and q > best_q:
+            best, best_q = PACKED_MEDIA_TYPE, q
+        elif media_type in (JSON_MEDIA_TYPE, "application/*", "*/*") and q > best_q:
+            best, best_q = JSON_MEDIA_TYPE, q
+    return best
+
+def encode_json(payload) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def encode_packed(payload: Dict) -> bytes:
+    """Binary form of an analysis response with polygons as quantized, delta-encoded uint16.
+
+    Layout (little-endian):
+      4 bytes   magic "ADP1"
+      uint32    header length H
+      H bytes   UTF-8 JSON of the payload, each prediction's "polygon" replaced by "points" (vertex count)
+      0-1 byte  padding to a 2-byte boundary
+      uint16[]  per prediction, in order: x0, y0, then (x_i - x_{i-1}) and (y_i - y_{i-1}) mod 2**16
+
+    Decoding is a running sum mod 2**16 divided by 65535.
+    """
+    predictions = payload.get("predictions") or []
+    polygons = [np.asarray(p.get("polygon") or [], dtype=np.float64) for p in predictions]
+
+    # RLE-only predictions carry no polygon and get no "points" count
+    header = dict(payload)
+    header["predictions"] = [
+        {**{k: v for k, v in p.items() if k != "polygon"}, "points": len(polygon) // 2} if "polygon" in p else p
+        for p, polygon in zip(predictions, polygons)
+    ]
+    header_bytes = encode_json(header)
+    padding = b"\0" * ((8 + len(header_bytes)) % 2)
+
+    prefix = PACKED_MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes + padding
+
+    lengths = [len(polygon) // 2 * 2 for polygon in polygons]
+    if not any(lengths):
+        # No findings, or RLE-only predictions: nothing to put in the body
+        return prefix
+
+    coords = np.concatenate([polygon[:length] for polygon, length in zip(polygons, lengths)])
+    quantized = np.round(np.clip(coords, 0.0, 1.0) * QUANT_SCALE).astype(np.int32)
+    deltas = np.empty_like(quantized)
+    deltas[2:] = quantized[2:] - quantized[:-2]
+
+    # Each polygon's first vertex is stored absolute
+    starts = np.cumsum([0] + lengths[:-1])[np.asarray(lengths) > 0]
+    deltas[starts] = quantized[starts]
+    deltas[starts + 1] = quantized[starts + 1]
+
+    return prefix + (deltas & 0xFFFF).astype("<u2").tobytes()
+
+def decode_packed(data: bytes) -> Dict:
+    """Inverse of ``encode_packed``; polygons come back as lists of floats."""
+    if data[:4] != PACKED_MAGIC:
+        raise ValueError("Not a packed predictions payload")
+    (header_length,) = struct.unpack_from("<I", data, 4)
+    payload = json.loads(data[8:8 + header_length])
+    offset = 8 + header_length + (8 + header_length) % 2
+    values = np.frombuffer(data, dtype="<u2", offset=offset).astype(np.int64)
+
+    position = 0
+    for prediction in payload.get("predictions") or []:
+        if "points" not in prediction:
+            continue
+        count = prediction.pop("points")
+        chunk = values[position:position + count * 2].reshape(-1, 2)
+        position += count * 2
+        coords = np.cumsum(chunk, axis=0) & 0xFFFF
+        prediction["polygon"] = (coords.ravel() / QUANT_SCALE).tolist()
+    return payload
+
+def encode_response(payload: Dict, media_type: str) -> Tuple[bytes, str]:
+    if media_type == PACKED_MEDIA_TYPE:
+        return encode_packed(payload), PACKED_MEDIA_TYPE
+    return encode_json(payload), JSON_MEDIA_TYPE
@@ -0,0 +1,126 @@
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Polygons are compared as masks rasterized with this longest side
+EVAL_MASK_SIZE = 640
+
+def label_path_for(image_path) -> Path:
+    """YOLO layout: .../images/<split>/name.jpg -> .../labels/<split>/name.txt"""
+    image_path = Path(image_path)
+    parts = list(image_path.parts)
+    for i in range(len(parts) - 1, -1, -1):
+        if parts[i] == "images":
+            parts[i] = "labels"
+            break
+    return Path(*parts).with_suffix(".txt")
+
+def load_yolo_labels(label_path) -> List[Dict]:
+    """Ground-truth polygons from a YOLO segmentation label file (normalized coordinates)"""
+    label_path = Path(label_path)
+    if not label_path.exists():
+        return []
+
+    labels = []
+    for line in label_path.read_text().splitlines():
+        values = line.split()
+        if len(values) < 7:
+            continue
+        labels.append({"class_id": int(values[0]), "polygon": [float(v) for v in values[1:]]})
+    return labels
+
+def rasterize(polygon: Sequence[float], shape: Tuple[int, int]) -> np.ndarray:
+    height, width = shape
+    mask = np.zeros(shape, dtype=np.uint8)
+    points = np.asarray(polygon, dtype=np.float32).reshape(-1, 2) * np.array([width, height], dtype=np.float32)
+    cv2.fillPoly(mask, [points.round().astype(np.int32)], 1)
+    return mask.astype(bool)
+
+def eval_shape(image_shape: Tuple[int, int], max_side: int = EVAL_MASK_SIZE) -> Tuple[int, int]:
+    height, width = image_shape[:2]
+    scale = min(1.0, max_side / max(height, width))
+    return max(1, int(round(height * scale))), max(1, int(round(width * scale)))
+
+def mask_ious(predicted: List[np.ndarray], truth: List[np.ndarray]) -> np.ndarray:
+    if not predicted or not truth:
+        return np.zeros((len(predicted), len(truth)), dtype=np.float32)
+
+    pred = np.stack([m.ravel() for m in predicted]).astype(np.float32)
+    gt = np.stack([m.ravel() for m in truth]).astype(np.float32)
+    intersection = pred @ gt.T
+    union = pred.sum(axis=1)[:, None] + gt.sum(axis=1)[None, :] - intersection
+    return intersection / np.maximum(union, 1.0)
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """Mean interpolated precision at 101 recall points, as in COCO.
+
+    Each threshold takes the best precision at any recall >= it (a step, not
+    a line); thresholds past the highest recall reached count as 0.
+    """
+    recall = np.asarray(recall, dtype=np.float64)
+    precision = np.asarray(precision, dtype=np.float64)
+    if recall.size == 0:
+        return 0.0
+    precision = np.flip(np.maximum.accumulate(np.flip(precision)))
+    indices = np.searchsorted(recall, np.linspace(0, 1, 101), side="left")
+    interpolated = np.where(indices < recall.size, precision[np.minimum(indices, recall.size - 1)], 0.0)
+    return float(np.mean(interpolated))
+
+class MaskMAP50:
+    """Accumulates segmentation matches image by image and reports mask mAP@50.
+
+    Ground truth can be dataset labels or another model's predictions, so
+    the same code measures accuracy and agreement with a reference model.
+    """
+
+    def __init__(self, num_classes: int, iou_threshold: float = 0.5):
+        self.num_classes = num_classes
+        self.iou_threshold = iou_threshold
+        self._scores: Dict[int, List[Tuple[float, bool]]] = {c: [] for c in range(num_classes)}
+        self._truth_counts = np.zeros(num_classes, dtype=np.int64)
+
+    def add(self, predictions: List[Dict], truth: List[Dict], image_shape: Tuple[int, int]):
+        shape = eval_shape(image_shape)
+
+        for class_id in range(self.num_classes):
+            preds = sorted((p for p in predictions if p["class_id"] == class_id),
+                           key=lambda p: p.get("confidence", 1.0), reverse=True)
+            gts = [t for t in truth if t["class_id"] == class_id]
+            self._truth_counts[class_id] += len(gts)
+            if not preds:
+                continue
+
+            ious = mask_ious([rasterize(p["polygon"], shape) for p in preds], [rasterize(t["polygon"], shape) for t in gts])
+            matched = np.zeros(len(gts), dtype=bool)
+            for i, prediction in enumerate(preds):
+                hit = False
+                if len(gts):
+                    candidates = np.where(~matched, ious[i], -1.0)
+                    best = int(candidates.argmax())
+                    if candidates[best] >= self.iou_threshold:
+                        matched[best] = True
+                        hit = True
+                self._scores[class_id].append((prediction.get("confidence", 1.0), hit))
+
+    def per_class(self) -> Dict[int, Optional[float]]:
+        results = {}
+        for class_id, scores in self._scores.items():
+            total = self._truth_counts[class_id]
+            if total == 0:
+                results[class_id] = None
+                continue
+            if not scores:
+                results[class_id] = 0.0
+                continue
+
+            hits = np.array([hit for _, hit in sorted(scores, key=lambda s: s[0], reverse=True)], dtype=np.float64)
+            true_positives = np.cumsum(hits)
+            recall = true_positives / total
+            precision = true_positives / np.arange(1, len(hits) + 1)
+            results[class_id] = average_precision(recall, precision)
+        return results
+
+    def map50(self) -> float:
+        values = [ap for ap in self.per_class().values() if ap is not None]
+        return float(np.mean(values)) if values else 0.0
@@ -1,8 +1,170 @@
 import cv2
+import mmap
+import struct
+import numpy as np
 from PIL import Image
+from typing import Dict, Optional, Tuple
 import os
 
+# (offset_x, scale_x, offset_y, scale_y): maps coordinates normalized to a
+# reduced decode back onto the original photo, see decode_image_reduced()
+NormTransform = Tuple[float, float, float, float]
+IDENTITY_TRANSFORM: NormTransform = (0.0, 1.0, 0.0, 1.0)
+
+REDUCED_DECODE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# EXIF orientation -> (swaps axes, flips display x, flips display y)
+EXIF_ORIENTATIONS = {
+    1: (False, False, False),
+    2: (False, True, False),
+    3: (False, True, True),
+    4: (False, False, True),
+    5: (True, False, False),
+    6: (True, True, False),
+    7: (True, True, True),
+    8: (True, False, True),
+}
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_IEND = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+def _exif_orientation(exif: bytes) -> int:
+    if len(exif) < 8 or exif[:2] not in (b"II", b"MM"):
+        return 1
+    
+    endian = "<" if exif[:2] == b"II" else ">"
+    ifd_offset = struct.unpack(endian + "I", exif[4:8])[0]
+    if ifd_offset + 2 > len(exif):
+        return 1
+    
+    entries = struct.unpack(endian + "H", exif[ifd_offset:ifd_offset + 2])[0]
+    for i in range(entries):
+        entry = ifd_offset + 2 + i * 12
+        if entry + 12 > len(exif):
+            break
+        tag, _, _ = struct.unpack(endian + "HHI", exif[entry:entry + 8])
+        if tag == 0x0112:
+            orientation = struct.unpack(endian + "H", exif[entry + 8:entry + 10])[0]
+            return orientation if 1 <= orientation <= 8 else 1
+    return 1
+
+def _probe_jpeg(data) -> Optional[Dict]:
+    size = len(data)
+    offset = 2
+    orientation = 1
+    
+    while offset + 4 <= size:
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        
+        length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+        segment = offset + 4
+        
+        if marker == 0xE1 and data[segment:segment + 6] == b"Exif\x00\x00":
+            orientation = _exif_orientation(bytes(data[segment + 6:offset + 2 + length]))
+        elif marker in JPEG_SOF_MARKERS:
+            if segment + 5 > size:
+                return None
+            height, width = struct.unpack(">HH", data[segment + 1:segment + 5])
+            # EOI may be followed by vendor trailers, so look for it near the end
+            tail = bytes(data[max(size - 65536, segment):size])
+            return {
+                "format": "JPEG",
+                "width": width,
+                "height": height,
+                "orientation": orientation,
+                "truncated": tail.rfind(b"\xff\xd9") == -1
+            }
+        elif marker == 0xDA:
+            return None
+        
+        offset += 2 + length
+    return None
+
+def _probe_png(data) -> Optional[Dict]:
+    if len(data) < 24 or data[12:16] != b"IHDR":
+        return None
+    
+    width, height = struct.unpack(">II", data[16:24])
+    return {
+        "format": "PNG",
+        "width": width,
+        "height": height,
+        "orientation": 1,
+        "truncated": bytes(data[-12:]) != PNG_IEND
+    }
+
+def _probe_bmp(data) -> Optional[Dict]:
+    if len(data) < 26:
+        return None
+    
+    declared_size = struct.unpack("<I", data[2:6])[0]
+    header_size = struct.unpack("<I", data[14:18])[0]
+    if header_size == 12:
+        width, height = struct.unpack("<HH", data[18:22])
+    else:
+        width, height = struct.unpack("<ii", data[18:26])
+    
+    return {
+        "format": "BMP",
+        "width": abs(width),
+        "height": abs(height),
+        "orientation": 1,
+        "truncated": len(data) < declared_size
+    }
+
+def probe_image(data) -> Optional[Dict]:
+    """Reads format, size, EXIF orientation and a truncation flag from the
+    headers of a JPEG, PNG or BMP without decoding any pixels.
+    
+    Returns None when the data is not a recognised image.
+    """
+    try:
+        if data[:3] == b"\xff\xd8\xff":
+            return _probe_jpeg(data)
+        if data[:8] == PNG_SIGNATURE:
+            return _probe_png(data)
+        if data[:2] == b"BM":
+            return _probe_bmp(data)
+    except struct.error:
+        return None
+    return None
+
+def probe_image_file(file_path: str) -> Optional[Dict]:
+    try:
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return probe_image(data)
+    except (OSError, ValueError):
+        return None
+
+def is_valid_probe(info: Optional[Dict]) -> bool:
+    return info is not None and not info["truncated"] and info["width"] > 0 and info["height"] > 0
+
+def display_size(info: Dict) -> Tuple[int, int]:
+    """(width, height) of a probed image as shown, i.e. after its EXIF orientation."""
+    swap = EXIF_ORIENTATIONS.get(info["orientation"], EXIF_ORIENTATIONS[1])[0]
+    return (info["height"], info["width"]) if swap else (info["width"], info["height"])
+
 def validate_image(file_path: str) -> bool:
+    info = probe_image_file(file_path)
+    if info is not None:
+        return is_valid_probe(info)
+    
     try:
         img = Image.open(file_path)
         img.verify()
@@ -10,6 +172,60 @@ def validate_image(file_path: str) -> bool:
     except Exception:
         return False
 
+def decode_image(data: bytes) -> Optional[np.ndarray]:
+    if not data:
+        return None
+    
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+def choose_decode_reduction(width: int, height: int, target_size: int) -> int:
+    reduction = 1
+    for factor in (2, 4, 8):
+        if max(width, height) / factor >= target_size:
+            reduction = factor
+    return reduction
+
+def decode_image_reduced(data: bytes, target_size: int) -> Tuple[Optional[np.ndarray], NormTransform]:
+    """Decodes a JPEG at 1/2, 1/4 or 1/8 scale in the DCT domain.
+    
+    The largest reduction whose long side still covers ``target_size`` is
+    used; EXIF orientation is applied by OpenCV. Scaled decodes round the
+    size up, so the returned transform maps normalized coordinates on the
+    decoded image back to normalized coordinates on the original photo.
+    """
+    info = probe_image(data)
+    if info is None or info["format"] != "JPEG" or not target_size:
+        return decode_image(data), IDENTITY_TRANSFORM
+    
+    width, height, orientation = info["width"], info["height"], info["orientation"]
+    reduction = choose_decode_reduction(width, height, target_size)
+    if reduction == 1:
+        return decode_image(data), IDENTITY_TRANSFORM
+    
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), REDUCED_DECODE_FLAGS[reduction])
+    if image is None:
+        return None, IDENTITY_TRANSFORM
+    
+    swap, flip_x, flip_y = EXIF_ORIENTATIONS.get(orientation, EXIF_ORIENTATIONS[1])
+    if swap:
+        width, height = height, width
+    
+    scale_x = image.shape[1] * reduction / width
+    scale_y = image.shape[0] * reduction / height
+    
+    return image, (
+        1.0 - scale_x if flip_x else 0.0, scale_x,
+        1.0 - scale_y if flip_y else 0.0, scale_y
+    )
+
+def validate_image_array(image: Optional[np.ndarray]) -> bool:
+    if image is None or image.ndim not in (2, 3):
+        return False
+    
+    h, w = image.shape[:2]
+    return h > 0 and w > 0
+
 def process_image(file_path: str, target_size: tuple = None) -> str:
     if target_size is None:
         return file_path
@@ -25,6 +241,10 @@ def process_image(file_path: str, target_size: tuple = None) -> str:
     return processed_path
 
 def get_image_dimensions(file_path: str) -> tuple:
+    info = probe_image_file(file_path)
+    if info is not None:
+        return info["height"], info["width"]
+    
     img = cv2.imread(file_path)
     if img is None:
         raise ValueError("Could not read image")
@@ -1,8 +1,8 @@
 import cv2
 import numpy as np
-from typing import List
+from typing import Dict, List, Optional, Sequence
 
-def mask_to_normalized_polygon(mask: np.ndarray, simplify: bool = True) -> List[float]:
+def _largest_contour(mask: np.ndarray, simplify: bool = True) -> Optional[np.ndarray]:
     mask_binary = (mask > 0.5).astype(np.uint8) * 255
     
     contours, _ = cv2.findContours(
@@ -12,7 +12,7 @@ def mask_to_normalized_polygon(mask: np.ndarray, simplify: bool = True) -> List[
     )
     
     if len(contours) == 0:
-        return []
+        return None
     
     largest_contour = max(contours, key=cv2.contourArea)
     
@@ -20,6 +20,14 @@ def mask_to_normalized_polygon(mask: np.ndarray, simplify: bool = True) -> List[
         epsilon = 0.002 * cv2.arcLength(largest_contour, True)
         largest_contour = cv2.approxPolyDP(largest_contour, epsilon, True)
     
+    return largest_contour
+
+def mask_to_normalized_polygon(mask: np.ndarray, simplify: bool = True) -> List[float]:
+    largest_contour = _largest_contour(mask, simplify)
+    
+    if largest_contour is None:
+        return []
+    
     h, w = mask.shape[:2]
     
     polygon = []
@@ -44,3 +52,155 @@ def normalize_polygon(polygon: List[tuple], width: int, height: int) -> List[flo
         normalized.extend([x / width, y / height])
     return normalized
 
+
+def _letterbox_window(mask_shape: Sequence[int], orig_shape: Sequence[int], box: Optional[Sequence[float]],
+                      margin: int = 0):
+    """Gain and padding mapping ``orig_shape`` into a letterboxed mask, and ``box``'s pixel window in the mask.
+
+    The window is (x0, y0, x1, y1) in mask pixels, or None without a usable box.
+    """
+    mask_h, mask_w = mask_shape[:2]
+    orig_h, orig_w = orig_shape[:2]
+    
+    gain = min(mask_h / orig_h, mask_w / orig_w)
+    pad_x = (mask_w - orig_w * gain) / 2
+    pad_y = (mask_h - orig_h * gain) / 2
+    
+    window = None
+    if box is not None:
+        x1, y1, x2, y2 = box
+        start_x = max(int(np.floor(x1 * gain + pad_x)) - margin, 0)
+        start_y = max(int(np.floor(y1 * gain + pad_y)) - margin, 0)
+        end_x = min(int(np.ceil(x2 * gain + pad_x)) + margin, mask_w)
+        end_y = min(int(np.ceil(y2 * gain + pad_y)) + margin, mask_h)
+        if end_x > start_x and end_y > start_y:
+            window = (start_x, start_y, end_x, end_y)
+    
+    return gain, pad_x, pad_y, window
+
+
+def mask_to_scaled_polygon(mask: np.ndarray, orig_shape: Sequence[int], box: Optional[Sequence[float]] = None,
+                           simplify: bool = True) -> List[float]:
+    """Trace ``mask`` at its own resolution and normalize against ``orig_shape``.
+
+    The mask is assumed to be a letterboxed view of the original image (scaled
+    by a single gain and centred), which covers both ultralytics masks and
+    unpadded ones. When ``box`` (xyxy in original pixels) is given, only that
+    region of the mask is traced.
+    """
+    orig_h, orig_w = orig_shape[:2]
+    gain, pad_x, pad_y, window = _letterbox_window(mask.shape, orig_shape, box, margin=1)
+    
+    offset_x = offset_y = 0
+    if window is not None:
+        offset_x, offset_y, end_x, end_y = window
+        mask = mask[offset_y:end_y, offset_x:end_x]
+    
+    largest_contour = _largest_contour(mask, simplify)
+    
+    if largest_contour is None:
+        return []
+    
+    points = largest_contour.reshape(-1, 2).astype(np.float64)
+    points[:, 0] = (points[:, 0] + offset_x - pad_x) / gain / orig_w
+    points[:, 1] = (points[:, 1] + offset_y - pad_y) / gain / orig_h
+    
+    return np.clip(points, 0.0, 1.0).ravel().tolist()
+
+
+def encode_rle(mask: np.ndarray) -> Dict:
+    """COCO-style uncompressed RLE: column-major run lengths, starting with a (possibly empty) run of zeros."""
+    height, width = mask.shape[:2]
+    pixels = (mask > 0.5).T.ravel()
+    if pixels.size == 0:
+        return {"size": [height, width], "counts": []}
+    
+    changes = np.flatnonzero(pixels[1:] != pixels[:-1]) + 1
+    counts = np.diff(np.concatenate(([0], changes, [pixels.size])))
+    if pixels[0]:
+        counts = np.concatenate(([0], counts))
+    return {"size": [height, width], "counts": counts.tolist()}
+
+
+def decode_rle(rle: Dict) -> np.ndarray:
+    height, width = rle["size"]
+    counts = np.asarray(rle["counts"], dtype=np.int64)
+    values = np.arange(len(counts)) % 2 == 1
+    return np.repeat(values, counts).reshape(width, height).T
+
+
+def mask_to_scaled_rle(mask: np.ndarray, orig_shape: Sequence[int], box: Optional[Sequence[float]] = None,
+                       original_resolution: bool = False) -> Optional[Dict]:
+    """Bbox-cropped RLE of a letterboxed ``mask`` plus where the crop sits in the original image.
+
+    ``region`` is the crop's normalized x/y/w/h; the RLE grid spans exactly
+    that region. The crop keeps the mask's own resolution unless
+    ``original_resolution`` is set, in which case it is resized to the
+    pixels of ``orig_shape``, the image the model was given. For a reduced
+    decode, ``rescale_rle_masks`` takes it on to the photo's real size.
+    Returns None when the crop holds no foreground.
+    """
+    orig_h, orig_w = orig_shape[:2]
+    gain, pad_x, pad_y, window = _letterbox_window(mask.shape, orig_shape, box)
+    if window is None:
+        window = (
+            max(int(np.floor(pad_x)), 0), max(int(np.floor(pad_y)), 0),
+            min(int(np.ceil(pad_x + orig_w * gain)), mask.shape[1]), min(int(np.ceil(pad_y + orig_h * gain)), mask.shape[0])
+        )
+    
+    start_x, start_y, end_x, end_y = window
+    crop = mask[start_y:end_y, start_x:end_x]
+    if not np.any(crop > 0.5):
+        return None
+    
+    if original_resolution and gain != 1.0:
+        size = (max(1, int(round(crop.shape[1] / gain))), max(1, int(round(crop.shape[0] / gain))))
+        crop = cv2.resize(crop.astype(np.float32), size, interpolation=cv2.INTER_NEAREST)
+    
+    rle = encode_rle(crop)
+    rle["region"] = {
+        "x": float((start_x - pad_x) / gain / orig_w),
+        "y": float((start_y - pad_y) / gain / orig_h),
+        "w": float((end_x - start_x) / gain / orig_w),
+        "h": float((end_y - start_y) / gain / orig_h)
+    }
+    return rle
+
+def rescale_rle_masks(predictions: List[Dict], width: int, height: int) -> List[Dict]:
+    """Resizes each RLE grid to its region's size in a ``width`` x ``height`` image."""
+    for prediction in predictions:
+        rle = prediction.get("mask")
+        if rle is None:
+            continue
+        region = rle["region"]
+        size = (max(1, int(round(region["w"] * width))), max(1, int(round(region["h"] * height))))
+        if tuple(rle["size"]) == (size[1], size[0]):
+            continue
+        grid = cv2.resize(decode_rle(rle).astype(np.uint8), size, interpolation=cv2.INTER_NEAREST)
+        prediction["mask"] = {**encode_rle(grid), "region": region}
+    return predictions
+
+def remap_predictions(predictions: List[Dict], transform: Sequence[float]) -> List[Dict]:
+    """Applies a per-axis ``offset + scale * value`` to normalized polygons, bboxes and mask regions."""
+    offset_x, scale_x, offset_y, scale_y = transform
+    if (offset_x, scale_x, offset_y, scale_y) == (0.0, 1.0, 0.0, 1.0):
+        return predictions
+    
+    def remap_box(box):
+        return {
+            "x": offset_x + scale_x * box["x"],
+            "y": offset_y + scale_y * box["y"],
+            "w": scale_x * box["w"],
+            "h": scale_y * box["h"]
+        }
+    
+    for prediction in predictions:
+        if "polygon" in prediction:
+            points = np.asarray(prediction["polygon"], dtype=np.float64).reshape(-1, 2)
+            points = points * (scale_x, scale_y) + (offset_x, offset_y)
+            prediction["polygon"] = np.clip(points, 0.0, 1.0).ravel().tolist()
+        if "mask" in prediction:
+            prediction["mask"]["region"] = remap_box(prediction["mask"]["region"])
+        
+        prediction["bbox"] = remap_box(prediction["bbox"])
+    return predictions
@@ -0,0 +1,95 @@
+import hashlib
+import json
+from typing import Callable, Optional, Tuple
+
+from starlette.exceptions import HTTPException
+
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+]
+
+class UploadTooLarge(Exception):
+    pass
+
+class UnsupportedUpload(Exception):
+    pass
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+async def read_upload(file, max_size: int, chunk_size: int = 1024 * 1024) -> Tuple[bytearray, str]:
+    """Reads an UploadFile in chunks, returning (content, sha256 hex digest).
+
+    Raises UnsupportedUpload if the first chunk does not start with a known
+    image signature and UploadTooLarge as soon as ``max_size`` is exceeded.
+    The multipart parser has already spooled the file by now; the body
+    itself is capped while it streams in by ``RequestSizeLimit``.
+    """
+    content = bytearray()
+    digest = hashlib.sha256()
+
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+
+        if not content and sniff_image_type(chunk[:16]) is None:
+            raise UnsupportedUpload("File content is not a supported image format")
+
+        if len(content) + len(chunk) > max_size:
+            raise UploadTooLarge(f"File size exceeds maximum allowed size of {max_size / 1024 / 1024}MB")
+
+        digest.update(chunk)
+        content += chunk
+
+    return content, digest.hexdigest()
+
+class RequestSizeLimit:
+    """ASGI middleware capping request bodies at ``limit_for(scope)`` bytes.
+
+    A declared Content-Length over the limit is rejected before anything is
+    read. Otherwise the bytes are counted as they arrive, so chunked bodies
+    are cut off too, as soon as they pass the limit and before the
+    multipart parser has spooled the rest.
+    """
+
+    def __init__(self, app, limit_for: Callable[[dict], int]):
+        self.app = app
+        self.limit_for = limit_for
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        limit = self.limit_for(scope)
+        detail = f"Request body exceeds maximum allowed size of {limit / 1024 / 1024}MB"
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            body = json.dumps({"detail": detail}).encode()
+            await send({"type": "http.response.start", "status": 413,
+                        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the body parser, so FastAPI answers with this 413
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -6,9 +6,15 @@ Run this before training to catch any issues early.
 """
 
 from pathlib import Path
-import cv2
+import os
 import sys
 
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
+
+from utils.image_processing import probe_image_file
+
 def validate_dataset(images_dir, labels_dir, dataset_name="Dataset"):
     """Validate dataset structure and labels"""
     print(f"\n{'='*70}")
@@ -58,13 +64,17 @@ def validate_dataset(images_dir, labels_dir, dataset_name="Dataset"):
             issues.append(f"Missing label: {label_path.name}")
             continue
         
-        # Check image can be read
-        img = cv2.imread(str(img_path))
-        if img is None:
+        # Check image headers (no pixel decode)
+        info = probe_image_file(str(img_path))
+        if info is None:
             issues.append(f"Invalid/corrupted image: {img_path.name}")
             continue
         
-        h, w = img.shape[:2]
+        if info["truncated"]:
+            issues.append(f"Truncated image: {img_path.name}")
+            continue
+        
+        h, w = info["height"], info["width"]
         if h == 0 or w == 0:
             issues.append(f"Zero-size image: {img_path.name}")
             continue
@@ -2,7 +2,7 @@ import React, { useMemo, useState, useRef, useEffect } from "react";
 import { useLocation, useNavigate } from "react-router-dom";
 import { FaTooth } from "react-icons/fa";
 import { FontAwesomeIcon } from "@fortawesome/react-fontawesome";
-import { analyzeImage } from "../../services/api";
+import { analyzeImageAsJob } from "../../services/api";
 import {
   faMagnifyingGlass,
   faSearchPlus,
@@ -319,7 +319,7 @@ function AnalysisPage() {
 
     setIsAnalyzing(true);
     try {
-      const data = await analyzeImage(imageFile);
+      const data = await analyzeImageAsJob(imageFile);
       
       if (data.predictions && Array.isArray(data.predictions)) {
         const formattedDetections = data.predictions.map((pred, index) => {
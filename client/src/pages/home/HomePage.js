@@ -8,7 +8,7 @@ import {
   faShieldAlt,
 } from "@fortawesome/free-solid-svg-icons";
 import AnalyzingOverlay from "../../components/UI/AnalyzingOverlay";
-import { analyzeImage } from "../../services/api";
+import { analyzeImageAsJob } from "../../services/api";
 import toothImage from "../../assets/images/tooth.png";
 import styles from "./HomePage.module.css";
 
@@ -95,7 +95,7 @@ function HomePage() {
       const file = fileInputRef.current?.files?.[0];
       if (file) {
         try {
-          const data = await analyzeImage(file);
+          const data = await analyzeImageAsJob(file);
           navigate("/analysis", { 
             state: { 
               image: fileDataUrl, 
@@ -2,6 +2,22 @@ import axios from "axios";
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || "http://localhost:8000";
 
+// Compact binary form of /api/analyze responses (see app/utils/encoding.py)
+const PACKED_MEDIA_TYPE = "application/vnd.alphadent.packed";
+const PACKED_MAGIC = "ADP1";
+const QUANT_SCALE = 65535;
+
+const FINAL_JOB_STATES = ["succeeded", "failed", "cancelled"];
+const JOB_POLL_INTERVAL_MS = 1000;
+
+const parseJson = (buffer) => {
+  try {
+    return JSON.parse(new TextDecoder().decode(buffer));
+  } catch {
+    return null;
+  }
+};
+
 const api = axios.create({
   baseURL: API_BASE_URL,
   timeout: 60000,
@@ -25,11 +41,16 @@ api.interceptors.response.use(
   },
   (error) => {
     if (error.response) {
+      if (error.response.data instanceof ArrayBuffer) {
+        error.response.data = parseJson(error.response.data);
+      }
       const message =
         error.response.data?.detail ||
         error.response.data?.message ||
         error.message;
-      return Promise.reject(new Error(message));
+      const rejection = new Error(message);
+      rejection.status = error.response.status;
+      return Promise.reject(rejection);
     } else if (error.request) {
       return Promise.reject(
         new Error(
@@ -42,6 +63,53 @@ api.interceptors.response.use(
   }
 );
 
+// Header JSON with per-prediction vertex counts, then uint16 polygon
+// coordinates: first vertex absolute, the rest deltas mod 2^16
+export const decodePackedPredictions = (buffer) => {
+  const bytes = new Uint8Array(buffer);
+  const magic = String.fromCharCode(...bytes.subarray(0, 4));
+  if (magic !== PACKED_MAGIC) {
+    throw new Error("Unexpected response format from server");
+  }
+
+  const headerLength = new DataView(buffer).getUint32(4, true);
+  const payload = JSON.parse(
+    new TextDecoder().decode(bytes.subarray(8, 8 + headerLength))
+  );
+  const offset = 8 + headerLength + ((8 + headerLength) % 2);
+  const values = new Uint16Array(buffer, offset, (buffer.byteLength - offset) >> 1);
+
+  let position = 0;
+  for (const prediction of payload.predictions || []) {
+    if (prediction.points === undefined) {
+      continue;
+    }
+    const count = prediction.points;
+    const polygon = new Array(count * 2);
+    let x = 0;
+    let y = 0;
+    for (let i = 0; i < count; i++) {
+      x = (x + values[position++]) & 0xffff;
+      y = (y + values[position++]) & 0xffff;
+      polygon[2 * i] = x / QUANT_SCALE;
+      polygon[2 * i + 1] = y / QUANT_SCALE;
+    }
+    delete prediction.points;
+    prediction.polygon = polygon;
+  }
+  return payload;
+};
+
+const PACKED_ACCEPT = `${PACKED_MEDIA_TYPE}, application/json;q=0.9`;
+
+const decodeAnalysisResponse = (response) => {
+  const contentType = response.headers["content-type"] || "";
+  if (contentType.startsWith(PACKED_MEDIA_TYPE)) {
+    return decodePackedPredictions(response.data);
+  }
+  return parseJson(response.data);
+};
+
 export const analyzeImage = async (imageFile) => {
   const formData = new FormData();
   formData.append("file", imageFile);
@@ -49,12 +117,134 @@ export const analyzeImage = async (imageFile) => {
   const response = await api.post("/api/analyze", formData, {
     headers: {
       "Content-Type": "multipart/form-data",
+      Accept: PACKED_ACCEPT,
     },
+    responseType: "arraybuffer",
+  });
+  return decodeAnalysisResponse(response);
+};
+
+export const submitAnalysisJob = async (imageFile, { output } = {}) => {
+  const formData = new FormData();
+  formData.append("file", imageFile);
+
+  const response = await api.post("/api/jobs", formData, {
+    params: output ? { output } : undefined,
+  });
+  return response.data;
+};
+
+export const getJob = async (jobId, { withResult = true } = {}) => {
+  const response = await api.get(`/api/jobs/${jobId}`, {
+    params: withResult ? undefined : { result: false },
   });
+  return response.data;
+};
 
+// A succeeded job's result, packed when the server supports it
+export const getJobResult = async (jobId) => {
+  const response = await api.get(`/api/jobs/${jobId}/result`, {
+    headers: { Accept: PACKED_ACCEPT },
+    responseType: "arraybuffer",
+  });
+  return decodeAnalysisResponse(response);
+};
+
+export const cancelJob = async (jobId) => {
+  const response = await api.delete(`/api/jobs/${jobId}`);
   return response.data;
 };
 
+const pollJob = async (jobId, { onStatus, signal, withResult } = {}) => {
+  let lastStatus = null;
+  while (!signal?.aborted) {
+    const job = await getJob(jobId, { withResult });
+    if (job.status !== lastStatus) {
+      lastStatus = job.status;
+      onStatus?.(job);
+    }
+    if (FINAL_JOB_STATES.includes(job.status)) {
+      return job;
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+  throw new Error("Analysis cancelled");
+};
+
+// Resolves with the job once it is final. Follows Server-Sent Events and
+// falls back to polling when they are unavailable or the stream drops.
+// withResult: false leaves the result out, to fetch it with getJobResult.
+export const waitForJob = (jobId, { onStatus, signal, withResult = true } = {}) =>
+  new Promise((resolve, reject) => {
+    let settled = false;
+    let source = null;
+
+    const settle = (fn, value) => {
+      if (!settled) {
+        settled = true;
+        source?.close();
+        fn(value);
+      }
+    };
+
+    const fallBackToPolling = () => {
+      source?.close();
+      pollJob(jobId, { onStatus, signal, withResult }).then(
+        (job) => settle(resolve, job),
+        (error) => settle(reject, error)
+      );
+    };
+
+    signal?.addEventListener("abort", () => {
+      cancelJob(jobId).catch(() => {});
+      settle(reject, new Error("Analysis cancelled"));
+    });
+
+    if (typeof EventSource === "undefined") {
+      fallBackToPolling();
+      return;
+    }
+
+    const query = withResult ? "" : "?result=false";
+    source = new EventSource(`${API_BASE_URL}/api/jobs/${jobId}/events${query}`);
+    source.addEventListener("status", (event) => {
+      const job = JSON.parse(event.data);
+      onStatus?.(job);
+      if (FINAL_JOB_STATES.includes(job.status)) {
+        settle(resolve, job);
+      }
+    });
+    source.addEventListener("gone", () => {
+      settle(reject, new Error("Analysis job expired"));
+    });
+    source.onerror = () => {
+      if (!settled) {
+        fallBackToPolling();
+      }
+    };
+  });
+
+// Runs an analysis as a background job, so it is not bound by the request
+// timeout; servers without the job API get a direct /api/analyze call
+export const analyzeImageAsJob = async (imageFile, { onStatus, signal, output } = {}) => {
+  let job;
+  try {
+    job = await submitAnalysisJob(imageFile, { output });
+  } catch (error) {
+    if (error.status === 404) {
+      return analyzeImage(imageFile);
+    }
+    throw error;
+  }
+
+  const finished = await waitForJob(job.job_id, { onStatus, signal, withResult: false });
+  if (finished.status !== "succeeded") {
+    throw new Error(finished.error || `Analysis ${finished.status}`);
+  }
+  // Fetched separately so it can come packed, like an /api/analyze response
+  return getJobResult(job.job_id);
+};
+
 export const getClasses = async () => {
   const response = await api.get("/api/classes");
   return response.data;